@@ -1,67 +1,57 @@
-import asana
-from asana.rest import ApiException
-from openai import OpenAI
 from dotenv import load_dotenv
 from datetime import datetime
+from functools import lru_cache
 import json
 import os
+import sys
+import threading
+
+# Make the shared helpers in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.asana_tasks import create_task_with_subtasks
+from common.asana_metadata import AsanaMetadataCache
+from common.tracing import event, span, turn
+from common.llm_cache import cache_key, get_llm_cache
 
 load_dotenv() 
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
 
-# Setting up Asana API client 
-configuration = asana.Configuration()
-configuration.access_token = os.getenv('ASANA_ACCESS_TOKEN', '')
-api_client = asana.ApiClient(configuration)
+# The OpenAI and Asana SDKs are imported and their clients created the first time they're needed,
+# so the chat prompt shows up without waiting for them to load
+@lru_cache(maxsize=None)
+def get_client():
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+@lru_cache(maxsize=None)
+def get_tasks_api():
+    import asana
+
+    # Setting up Asana API client 
+    configuration = asana.Configuration()
+    configuration.access_token = os.getenv('ASANA_ACCESS_TOKEN', '')
+    api_client = asana.ApiClient(configuration)
 
-# Setting up Asana tasks API instance. There are a bunch of APIs that can be used to interact with Asana.
-tasks_api_instance = asana.TasksApi(api_client)
+    # Setting up Asana tasks API instance. There are a bunch of APIs that can be used to interact with Asana.
+    return asana.TasksApi(api_client)
+
+# Cached users, projects, tasks and custom fields so the AI can refer to them by name instead of GID
+@lru_cache(maxsize=None)
+def get_metadata_cache():
+    return AsanaMetadataCache(get_tasks_api().api_client)
 
 # Function that adds tasks to ASANA
 def create_asana_task(task_name, due_on="today", description=None, assignee=None, dependencies=None, custom_fields=None, subtasks=None):
     """
     Creates a task in Asana with enhanced capabilities
     """
-    if due_on == "today":
-        due_on = str(datetime.now().date())
-
-    task_body = {
-        "data": {
-            "name": task_name,
-            "due_on": due_on,
-            "projects": [os.getenv("ASANA_PROJECT_ID", "")]
-        }
-    }
-    
-    # Add optional fields if provided
-    if description:
-        task_body["data"]["notes"] = description
-    if assignee:
-        task_body["data"]["assignee"] = assignee
-    if dependencies:
-        task_body["data"]["dependencies"] = dependencies
-    if custom_fields:
-        task_body["data"]["custom_fields"] = custom_fields
+    from asana.rest import ApiException
 
     try:
-        # Create main task
-        api_response = tasks_api_instance.create_task(task_body, {})
-        task_gid = api_response['gid']
-
-         # Create subtasks if provided
-        if subtasks:
-            for subtask_name in subtasks:
-                subtask_body = {
-                    "data": {
-                        "name": subtask_name,
-                        "parent": task_gid,
-                        "projects": [os.getenv("ASANA_PROJECT_ID", "")]
-                    }
-                }
-                tasks_api_instance.create_task(subtask_body, {})
-
+        api_response = create_task_with_subtasks(
+            get_tasks_api(), get_metadata_cache(), task_name, due_on, description, assignee, dependencies, custom_fields, subtasks
+        )
         return json.dumps(api_response, indent=2)
     except ApiException as e:
         return f"Exception when calling TasksApi->create_task: {e}"
@@ -92,16 +82,16 @@ def get_tools():
                         },
                         "assignee": {
                             "type": "string",
-                            "description": "Asana user GID to assign the task to"
+                            "description": "Name, email or GID of the Asana user to assign the task to"
                         },
                         "dependencies": {
                             "type": "array",
                             "items": {"type": "string"},
-                            "description": "List of task GIDs that this task depends on"
+                            "description": "List of names or GIDs of the tasks that this task depends on"
                         },
                         "custom_fields": {
                             "type": "object",
-                            "description": "Dictionary of custom field GIDs and their values"
+                            "description": "Dictionary of custom field names (or GIDs) and their values"
                         },
                         "subtasks": {
                             "type": "array",
@@ -117,11 +107,33 @@ def get_tools():
 
     return tools   
     
+# Calls the OpenAI chat completions API, recording the call's latency and token usage in the trace.
+# When LLM_CACHE is enabled, a prompt that was already sent gets the stored response instead
+def create_completion(messages, tools=None):
+    llm_cache = get_llm_cache()
+    if llm_cache:
+        serialized = [message if isinstance(message, dict) else message.model_dump(exclude_none=True) for message in messages]
+        key = cache_key(model, serialized, tools)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            from openai.types.chat import ChatCompletion
+            # Recorded without token usage, no tokens were spent on it
+            event("llm", model, cached=True)
+            return ChatCompletion.model_validate_json(cached)
+
+    with span("llm", model) as current:
+        completion = get_client().chat.completions.create(model=model, messages=messages, **({"tools": tools} if tools else {}))
+        if completion.usage:
+            current.set(prompt_tokens=completion.usage.prompt_tokens, completion_tokens=completion.usage.completion_tokens)
+
+    if llm_cache:
+        llm_cache.set(key, completion.model_dump_json())
+    return completion
+
 # Function that prompts the AI 
 def prompt_ai(messages):
     # First, we'll prompt the AI with the latest user's message
-    completion = client.chat.completions.create(
-        model=model,
+    completion = create_completion(
         messages=messages, # list of all messages, not just the latest
         tools=get_tools()  # This is what makes it an AI agent, it's the functions that it runs to do things interactively in the outside world
     )
@@ -142,9 +154,16 @@ def prompt_ai(messages):
         # Next, for each tool the AI wanted to call, call it and add the tool result to the list of messages
         for tool_call in tool_calls:
             function_name = tool_call.function.name
-            function_to_call = available_functions[function_name]
-            function_args = json.loads(tool_call.function.arguments)
-            function_response = function_to_call(**function_args)
+            function_to_call = available_functions.get(function_name)
+            # Unknown tools and invalid arguments are reported to the AI instead of ending the chat
+            if function_to_call is None:
+                function_response = f"Error: there is no tool named {function_name!r}, the available tools are: {', '.join(available_functions)}"
+            else:
+                try:
+                    with span("tool", function_name):
+                        function_response = function_to_call(**json.loads(tool_call.function.arguments))
+                except (TypeError, ValueError) as e:
+                    function_response = f"Error: {type(e).__name__}: {e}"
 
             messages.append({
                 "tool_call_id": tool_call.id,
@@ -154,10 +173,7 @@ def prompt_ai(messages):
             })
         
         # Call the AI again so it can produce a response with the result of calling the tool(s)
-        second_response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-        )
+        second_response = create_completion(messages=messages)
         
         # return it to the system message so that we add it to the chat history
         return second_response.choices[0].message.content 
@@ -180,6 +196,9 @@ def main():
         }
     ]
     
+    # Start loading the Asana SDK, users, tasks and custom fields while the user types their first message
+    threading.Thread(target=lambda: get_metadata_cache().preload(), daemon=True).start()
+
     # Loop forever and ask the user for another message to send to the AI. If I type 'q' then I quit.
     while True:
         user_input = input("Chat with AI (q to quit): ").strip()
@@ -190,7 +209,8 @@ def main():
         # Once we get the input from the users, we'll add it to the messages list. Content of the message is the user's input.
         messages.append({"role": "user", "content": user_input})
         # We'll create a function "prompt_ai" that will take the messages list and send it to the AI.
-        ai_response = prompt_ai(messages)
+        with turn("asana-agent"):
+            ai_response = prompt_ai(messages)
          
         # We'll print the response then add the AI's response to the messages list.
         print(ai_response)
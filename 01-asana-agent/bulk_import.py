@@ -0,0 +1,255 @@
+import asana
+from asana.rest import ApiException
+from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+
+# Make the shared helpers in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.asana_tasks import build_resolved_task_body, build_subtask_body
+from common.asana_api import create_task
+from common.asana_metadata import AsanaMetadataCache
+
+load_dotenv()
+
+# Setting up Asana API client, the same way the chat agent does
+configuration = asana.Configuration()
+configuration.access_token = os.getenv('ASANA_ACCESS_TOKEN', '')
+api_client = asana.ApiClient(configuration)
+tasks_api_instance = asana.TasksApi(api_client)
+
+
+class RateLimiter:
+    """
+    Spaces out requests so that at most `requests_per_minute` are sent to Asana.
+    Asana allows 150 requests per minute on free workspaces and 1500 on paid ones.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+
+def split_list(value):
+    """CSV cells hold lists as `a;b;c`, JSONL rows can use real lists"""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in str(value).split(";") if item.strip()]
+
+
+def read_rows(path):
+    """
+    Streams task rows from a CSV or JSONL file.
+
+    Each row has the same fields as the create_asana_task tool (task_name, due_on, description, assignee,
+    dependencies, custom_fields, subtasks) plus an optional `key` used by other rows to depend on it.
+    Rows without a key are keyed by their row number.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+
+        for row_number, row in enumerate(rows, start=1):
+            custom_fields = row.get("custom_fields") or None
+            if isinstance(custom_fields, str):
+                custom_fields = json.loads(custom_fields)
+
+            yield {
+                "key": str(row.get("key") or row_number),
+                "task_name": row["task_name"],
+                "due_on": row.get("due_on") or "today",
+                "description": row.get("description") or None,
+                "assignee": row.get("assignee") or None,
+                "dependencies": [str(dep) for dep in split_list(row.get("dependencies"))],
+                "custom_fields": custom_fields,
+                "subtasks": split_list(row.get("subtasks")),
+            }
+
+
+def read_keys(path):
+    """The keys of every row in the file, read without keeping the rows, so dependencies on later rows can be told apart from Asana GIDs"""
+    return {row["key"] for row in read_rows(path)}
+
+
+def load_results(path):
+    """
+    Reads a previous results file so that a rerun skips the tasks that were already created.
+    Returns the last "created" or "partial" result of every key, partial results are rows whose task was created
+    but not all of its subtasks.
+    """
+    results = {}
+    if not os.path.exists(path):
+        return results
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            if result.get("status") in ("created", "partial"):
+                results[result["key"]] = result
+
+    return results
+
+
+def create_task_from_row(row, dependency_gids, rate_limiter, metadata_cache, previous=None):
+    """
+    Creates one task (and its subtasks) in Asana, returning the line to write to the results file.
+
+    Assignee, dependency and custom field names are resolved to GIDs with `metadata_cache`, like the chat agent's
+    tool does. `previous` is the partial result of an earlier run: its task and the subtasks it already created
+    are reused and only the missing subtasks are created.
+    """
+    # Rows are deduplicated by their key rather than by name, different rows may create tasks with the same name.
+    # Every request, including retries, waits for the rate limiter
+    idempotency_key = f"bulk-import:{row['key']}"
+    task_gid = previous["gid"] if previous else None
+    subtask_gids = list(previous["subtask_gids"]) if previous else []
+    try:
+        if task_gid is None:
+            task_body = build_resolved_task_body(
+                metadata_cache, row["task_name"], row["due_on"], row["description"], row["assignee"], dependency_gids, row["custom_fields"]
+            )
+            api_response = create_task(tasks_api_instance, task_body, idempotency_key, before_request=rate_limiter.wait)
+            task_gid = api_response['gid']
+
+        # Subtasks are created in order, so the ones already created are the first len(subtask_gids)
+        for index, subtask_name in enumerate(row["subtasks"][len(subtask_gids):], start=len(subtask_gids)):
+            subtask_body = build_subtask_body(subtask_name, task_gid)
+            subtask_response = create_task(tasks_api_instance, subtask_body, f"{idempotency_key}:subtask:{index}", before_request=rate_limiter.wait)
+            subtask_gids.append(subtask_response['gid'])
+
+        return {"key": row["key"], "status": "created", "gid": task_gid, "subtask_gids": subtask_gids}
+    except ApiException as e:
+        error = f"Exception when calling TasksApi->create_task: {e}"
+        if task_gid is None:
+            return {"key": row["key"], "status": "error", "error": error}
+        # The task exists, record it so a rerun doesn't create it again
+        return {"key": row["key"], "status": "partial", "gid": task_gid, "subtask_gids": subtask_gids, "error": error}
+
+
+def bulk_import(input_path, results_path, max_workers=10, requests_per_minute=150):
+    """
+    Creates every task in `input_path` concurrently, respecting the Asana rate limit.
+
+    A task is only submitted once all the tasks it depends on (by key) have been created, so dependencies can
+    point at their real GIDs. Dependencies that don't match a key in the file are Asana GIDs or task names.
+    Rows are streamed from the file, only the ones being created or waiting for a dependency are kept in memory.
+    Every outcome is appended to `results_path`, tasks already created there are skipped on a rerun and partially
+    created ones only get their missing subtasks.
+    """
+    previous_results = load_results(results_path)
+    created = {key: result["gid"] for key, result in previous_results.items() if result["status"] == "created"}
+    partial = {key: result for key, result in previous_results.items() if result["status"] == "partial"}
+    rate_limiter = RateLimiter(requests_per_minute)
+    metadata_cache = AsanaMetadataCache(api_client, before_request=rate_limiter.wait)
+    keys_in_file = read_keys(input_path)
+
+    # Rows waiting for their dependencies to be created
+    pending = []
+    failed = set()
+    counts = {"created": 0, "partial": 0, "skipped": 0, "error": 0}
+
+    def resolve_dependencies(row):
+        """Returns the dependency GIDs for a row, or None if it still has to wait for some of them"""
+        gids = []
+        for dep in row["dependencies"]:
+            if dep in created:
+                gids.append(created[dep])
+            elif dep in keys_in_file:
+                return None
+            else:
+                gids.append(dep)
+        return gids
+
+    with open(results_path, "a", encoding="utf-8") as results_file, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+
+        def record(result):
+            results_file.write(json.dumps(result) + "\n")
+            results_file.flush()
+            counts[result["status"]] += 1
+
+        def submit_ready(candidates):
+            """Submits the candidate rows whose dependencies are created, keeps the rest pending"""
+            waiting = []
+            for row in candidates:
+                if any(dep in failed for dep in row["dependencies"]):
+                    failed.add(row["key"])
+                    record({"key": row["key"], "status": "error", "error": "A dependency failed to be created"})
+                    continue
+
+                dependency_gids = resolve_dependencies(row)
+                if dependency_gids is None:
+                    waiting.append(row)
+                else:
+                    future = executor.submit(create_task_from_row, row, dependency_gids, rate_limiter, metadata_cache, partial.get(row["key"]))
+                    running[future] = row
+            return waiting
+
+        def collect():
+            """Records the finished tasks and releases the rows that were waiting on them"""
+            nonlocal pending
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                row = running.pop(future)
+                result = future.result()
+                record(result)
+                if result["status"] == "created":
+                    created[row["key"]] = result["gid"]
+                else:
+                    failed.add(row["key"])
+            pending = submit_ready(pending)
+
+        for row in read_rows(input_path):
+            if row["key"] in created:
+                counts["skipped"] += 1
+                continue
+            pending.extend(submit_ready([row]))
+            # Don't read further ahead than the workers can keep up with
+            while len(running) >= max_workers * 2:
+                collect()
+
+        while running:
+            collect()
+
+        # Anything left depends on a task that is never created (e.g. a dependency cycle)
+        for row in pending:
+            record({"key": row["key"], "status": "error", "error": "Unresolved dependency"})
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import tasks into Asana from a CSV or JSONL file")
+    parser.add_argument("input", help="CSV or JSONL file with one task per row")
+    parser.add_argument("--results", default="import_results.jsonl", help="File the created task GIDs are written to, reruns resume from it")
+    parser.add_argument("--workers", type=int, default=10, help="Maximum number of tasks created at the same time")
+    parser.add_argument("--requests-per-minute", type=int, default=int(os.getenv("ASANA_REQUESTS_PER_MINUTE", "150")))
+    args = parser.parse_args()
+
+    counts = bulk_import(args.input, args.results, args.workers, args.requests_per_minute)
+    print(f"Created: {counts['created']}, partially created (rerun to finish): {counts['partial']}, skipped (already created): {counts['skipped']}, errors: {counts['error']}")
+    print(f"Results written to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
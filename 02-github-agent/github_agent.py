@@ -1,19 +1,21 @@
-from github import Github
-from openai import OpenAI
 from dotenv import load_dotenv
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import json
 import os
+import sys
 import streamlit as st
 
-from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage, AIMessage
 
+# Make the shared helpers in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.tracing import event, span, turn, in_current_context
+
 load_dotenv()
 
 # print(f"Using repo: {os.getenv('GITHUB_REPO')}")
-print(f"Token exists: {bool(os.getenv('GITHUB_TOKEN'))}")
+event("github", "startup", token_exists=bool(os.getenv('GITHUB_TOKEN')))
 
 # client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
@@ -22,27 +24,25 @@ model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
 # g = Github(os.getenv('GITHUB_TOKEN'))
 
 def verify_github_connection():
-    print(f"Authenticated user: {g.get_user().login}")
-    print(f"Repository access: {repo.full_name}")
+    # The authenticated user and repository go in the trace, a failed check is recorded as the span's error
+    with span("github", "verify_connection") as current:
+        current.set(user=g.get_user().login, repository=repo.full_name)
     return True
 
 def generate_pr_description(head_branch):
     """Generates PR description based on branch commits"""
     try:
-        print("Starting PR description generation...")
-        print(f"Fetching commits from branch: {head_branch}")
-        
         # Get commits specific to the feature branch
-        base_commits = set(commit.sha for commit in list(repo.get_commits(sha='main')))
-        print(f"Commits in main: {len(base_commits)}")
-        feature_commits = repo.get_commits(sha=head_branch)
-        
+        with span("github", "get_commits", branch="main") as current:
+            base_commits = set(commit.sha for commit in list(repo.get_commits(sha='main')))
+            current.set(commits=len(base_commits))
+
         commit_messages = []
-        for commit in feature_commits:
-            if commit.sha not in base_commits:
-                message = commit.commit.message
-                commit_messages.append(message)
-                print(f"Found commit: {message}")
+        with span("github", "get_commits", branch=head_branch) as current:
+            for commit in repo.get_commits(sha=head_branch):
+                if commit.sha not in base_commits:
+                    commit_messages.append(commit.commit.message)
+            current.set(commits=len(commit_messages))
         
         if not commit_messages:
             return "No unique commits found in this branch"
@@ -54,15 +54,17 @@ def generate_pr_description(head_branch):
             "\n\nFocus on:\n- Main changes implemented\n- Key features or fixes\n- Any breaking changes"
         )
         
-        chatbot = ChatOpenAI(model=os.getenv('OPENAI_MODEL', 'gpt-4'))
+        from langchain_openai import ChatOpenAI
+        from common.langchain_tracing import TracingCallbackHandler
+        from common.langchain_cache import langchain_cache
+
+        chatbot = ChatOpenAI(model=os.getenv('OPENAI_MODEL', 'gpt-4'), callbacks=[TracingCallbackHandler()], cache=langchain_cache())
         response = chatbot.invoke([HumanMessage(content=description_prompt)])
         
         return response.content
     except Exception as e:
-        print(f"Error fetching commits: {str(e)}")
         return f"Could not generate description from commits. Using default description. Error: {str(e)}"
 
-@tool
 def create_github_issue(title, body=None, labels=None, assignee=None, milestone=None):
     """
     Creates a GitHub issue with enhanced capabilities.
@@ -78,38 +80,27 @@ def create_github_issue(title, body=None, labels=None, assignee=None, milestone=
         str: JSON string containing the created issue data
     """
     try:
-        print("Starting issue creation...")
-        print(f"Repository object exists: {repo is not None}")
-        print(f"Attempting to create issue with title: {title}")
-        
-        issue = repo.create_issue(
-            title=title,
-            body=body if body else "No description provided",
-            labels=labels,
-            assignee=assignee,
-            milestone=milestone
-        )
-        
-        print(f"Issue successfully created!")
-        print(f"Issue ID: {issue.id}")
-        print(f"Issue URL: {issue.html_url}")
+        # PyGithub expects a Milestone object and rejects None for optional fields, so only pass the ones that were provided
+        if milestone is not None:
+            milestone = repo.get_milestone(int(milestone))
+        optional_fields = {"labels": labels, "assignee": assignee, "milestone": milestone}
+        with span("github", "create_issue") as current:
+            issue = repo.create_issue(
+                title=title,
+                body=body if body else "No description provided",
+                **{name: value for name, value in optional_fields.items() if value is not None}
+            )
+            current.set(issue_id=issue.id, url=issue.html_url)
+
         return json.dumps(issue.raw_data, indent=2)
     except Exception as e:
-        print(f"Error type: {type(e)}")
-        print(f"Error message: {str(e)}")
         return f"Exception details when creating GitHub issue: {str(e)}"
 
-@tool
 def create_pull_request(title, body=None, base="main", head=None, draft=False):
     """
     Creates a GitHub Pull Request with specified parameters.
     """
     try:
-        print("Starting Pull Request creation...")
-        print(f"Repository object exists: {repo is not None}")
-        print(f"Attempting to create Pull Request with title: {title}")
-        print(f"Base branch: {base}")
-        print(f"Head branch: {head}")
         # Validate head branch exists
         if not head:
             return "Error: Head branch name is required"
@@ -117,26 +108,69 @@ def create_pull_request(title, body=None, base="main", head=None, draft=False):
         # Generate description from commits if no body provided
         if not body:
             body = generate_pr_description(head)
-            print(f"Generated PR description: {body}")
-
-        pr = repo.create_pull(
-            title=title,
-            body=body,
-            base=base,
-            head=head,
-            draft=draft
-        )
+
+        with span("github", "create_pull", base=base, head=head) as current:
+            pr = repo.create_pull(
+                title=title,
+                body=body,
+                base=base,
+                head=head,
+                draft=draft
+            )
+            current.set(url=pr.html_url)
         return json.dumps(pr.raw_data, indent=2)
     except Exception as e:
         return f"Exception when creating Pull Request: {e}"
 
-def prompt_ai(messages):
-    # Initialize OpenAI client with user's API key
-    client = OpenAI(api_key=st.session_state.openai_key)
+# The tools run this script's functions, so they are built again on every Streamlit run: a run's `repo` and `g`
+# are globals of that run, tools kept from an earlier run would still use the repository it connected to
+def get_github_tools():
+    from langchain_core.tools import tool
+
+    return {
+        "create_pull_request": (tool(create_pull_request), "Pull request"),
+        "create_github_issue": (tool(create_github_issue), "Issue"),
+    }
+
+# The chat model is built the first time the AI is prompted (once per OpenAI key), so the OpenAI integration is
+# only imported then instead of when the page first loads. Only the tools' schemas are bound to it
+@st.cache_resource
+def get_github_chatbot(openai_key):
+    from langchain_openai import ChatOpenAI
+    from common.langchain_tracing import TracingCallbackHandler
+    from common.langchain_cache import langchain_cache
 
-    tools = [create_github_issue, create_pull_request]
-    github_chatbot = ChatOpenAI(model=os.getenv('OPENAI_MODEL', 'gpt-4o-mini'))
-    github_chatbot_with_tools = github_chatbot.bind_tools(tools)
+    github_chatbot = ChatOpenAI(model=os.getenv('OPENAI_MODEL', 'gpt-4o-mini'), api_key=openai_key, callbacks=[TracingCallbackHandler()], cache=langchain_cache())
+    return github_chatbot.bind_tools([selected_tool for selected_tool, _ in get_github_tools().values()])
+
+# Maximum number of tool calls from a single AI response that run at the same time
+max_tool_workers = int(os.getenv('GITHUB_TOOL_WORKERS', '4'))
+
+def run_tool_call(tool_call, available_tools):
+    """Runs a single tool call requested by the AI and formats its result for the user"""
+    function_name = tool_call['name']
+    function_args = tool_call['args']
+
+    if function_name not in available_tools:
+        return f"Error executing {function_name}: Unknown tool"
+    selected_tool, label = available_tools[function_name]
+
+    try:
+        with span("tool", function_name):
+            function_response = selected_tool.invoke(function_args)
+        if isinstance(function_response, str) and (function_response.startswith('Exception') or function_response.startswith('Error')):
+            return function_response
+        result = json.loads(function_response)
+        return f"✨ {label} created successfully!\n\nTitle: {result['title']}\nURL: {result['html_url']}\nStatus: {result['state']}"
+    except json.JSONDecodeError:
+        return f"Error processing {function_name}: Invalid response format"
+    except Exception as e:
+        return f"Error executing {function_name}: {str(e)}"
+
+def prompt_ai(messages):
+    # Chat model using the user's OpenAI API key
+    github_chatbot_with_tools = get_github_chatbot(st.session_state.openai_key)
+    available_tools = get_github_tools()
 
     # Enhanced system message with explicit instructions
     system_message = """I am a GitHub assistant that creates pull requests and issues independently.
@@ -150,31 +184,17 @@ def prompt_ai(messages):
     
     messages[0] = SystemMessage(content=system_message)
     ai_response = github_chatbot_with_tools.invoke(messages)
-    print(f"AI response: {ai_response}")
-    
+
     if hasattr(ai_response, 'tool_calls') and ai_response.tool_calls:
-        for tool_call in ai_response.tool_calls:
-            function_name = tool_call['name']
-            function_args = tool_call['args']
-            
-            try:
-                if function_name == 'create_pull_request':
-                    function_response = create_pull_request.invoke(function_args)
-                    if isinstance(function_response, str) and function_response.startswith('Exception'):
-                        return function_response
-                    result = json.loads(function_response)
-                    return f"✨ Pull request created successfully!\n\nTitle: {result['title']}\nURL: {result['html_url']}\nStatus: {result['state']}"
-                    
-                elif function_name == 'create_github_issue':
-                    function_response = create_github_issue.invoke(function_args)
-                    if isinstance(function_response, str) and function_response.startswith('Exception'):
-                        return function_response
-                    result = json.loads(function_response)
-                    return f"✨ Issue created successfully!\n\nTitle: {result['title']}\nURL: {result['html_url']}\nStatus: {result['state']}"
-            except json.JSONDecodeError:
-                return f"Error processing {function_name}: Invalid response format"
-            except Exception as e:
-                return f"Error executing {function_name}: {str(e)}"
+        # Run every tool call from this turn concurrently (bounded pool) so a bulk request
+        # like "open issues for these 10 bugs" only needs one round trip through the model
+        max_workers = min(max_tool_workers, len(ai_response.tool_calls))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # in_current_context keeps the worker threads' spans tagged with this turn
+            results = list(executor.map(in_current_context(run_tool_call), ai_response.tool_calls, [available_tools] * len(ai_response.tool_calls)))
+
+        # Aggregate the results (in the order the model asked for them) into a single response
+        return "\n\n---\n\n".join(results)
     
     return ai_response.content
 
@@ -218,6 +238,8 @@ def main():
             st.session_state.github_token = token_input
 
             with st.spinner('Verifying GitHub connection...'):
+                from github import Github
+
                 global repo, g
                 g = Github(token_input)
                 repo = g.get_repo(repo_input)
@@ -243,7 +265,7 @@ def main():
                 st.chat_message("user").markdown(prompt)
                 st.session_state.messages.append(HumanMessage(content=prompt))
 
-                with st.chat_message("assistant"):
+                with st.chat_message("assistant"), turn("github-agent"):
                     response = prompt_ai(st.session_state.messages)
                     st.markdown(response)
                 
@@ -1,110 +1,99 @@
-import asana
-from asana.rest import ApiException
-from openai import OpenAI
 from dotenv import load_dotenv
 from datetime import datetime
+from functools import lru_cache
 import json
 import os
+import sys
+import threading
 
-from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage
+from langchain_core.messages import SystemMessage, HumanMessage
+
+# Make the shared helpers in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.asana_tasks import create_task_with_subtasks
+from common.asana_api import max_in_flight
+from common.asana_metadata import AsanaMetadataCache
+from common.agent_loop import AgentRun, default_max_seconds, run_agent
+from common.tracing import turn
 
 load_dotenv() 
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
 
-# Setting up Asana API client 
-configuration = asana.Configuration()
-configuration.access_token = os.getenv('ASANA_ACCESS_TOKEN', '')
-api_client = asana.ApiClient(configuration)
+# The Asana SDK is imported and its client created the first time they are needed,
+# so the chat prompt shows up without waiting for it to load
+@lru_cache(maxsize=None)
+def get_tasks_api():
+    import asana
+
+    # Setting up Asana API client 
+    configuration = asana.Configuration()
+    configuration.access_token = os.getenv('ASANA_ACCESS_TOKEN', '')
+    # Keep a connection for every request that can be in flight at once, the agent service shares this client across sessions
+    configuration.connection_pool_maxsize = max_in_flight
+    api_client = asana.ApiClient(configuration)
 
-# Setting up Asana tasks API instance. There are a bunch of APIs that can be used to interact with Asana.
-tasks_api_instance = asana.TasksApi(api_client)
+    # Setting up Asana tasks API instance. There are a bunch of APIs that can be used to interact with Asana.
+    return asana.TasksApi(api_client)
+
+# Cached users, projects, tasks and custom fields so the AI can refer to them by name instead of GID
+@lru_cache(maxsize=None)
+def get_metadata_cache():
+    return AsanaMetadataCache(get_tasks_api().api_client)
 
 # Function that adds tasks to ASANA
-@tool # we're telling the agent that the function is a tool that it can invoke
 def create_asana_task(task_name, due_on="today", description=None, assignee=None, dependencies=None, custom_fields=None, subtasks=None):
     """
-    Creates a task in Asana with enhanced capabilities
+    Creates a task in Asana with enhanced capabilities.
+    The assignee can be a user's name or email, dependencies can be task names and custom_fields can use field
+    and option names, they are resolved to Asana GIDs automatically.
     """
-    if due_on == "today":
-        due_on = str(datetime.now().date())
-
-    task_body = {
-        "data": {
-            "name": task_name,
-            "due_on": due_on,
-            "projects": [os.getenv("ASANA_PROJECT_ID", "")]
-        }
-    }
-    
-    # Add optional fields if provided
-    if description:
-        task_body["data"]["notes"] = description
-    if assignee:
-        task_body["data"]["assignee"] = assignee
-    if dependencies:
-        task_body["data"]["dependencies"] = dependencies
-    if custom_fields:
-        task_body["data"]["custom_fields"] = custom_fields
+    from asana.rest import ApiException
 
     try:
-        # Create main task
-        api_response = tasks_api_instance.create_task(task_body, {})
-        task_gid = api_response['gid']
-
-         # Create subtasks if provided
-        if subtasks:
-            for subtask_name in subtasks:
-                subtask_body = {
-                    "data": {
-                        "name": subtask_name,
-                        "parent": task_gid,
-                        "projects": [os.getenv("ASANA_PROJECT_ID", "")]
-                    }
-                }
-                tasks_api_instance.create_task(subtask_body, {})
-
+        api_response = create_task_with_subtasks(
+            get_tasks_api(), get_metadata_cache(), task_name, due_on, description, assignee, dependencies, custom_fields, subtasks
+        )
         return json.dumps(api_response, indent=2)
     except ApiException as e:
         return f"Exception when calling TasksApi->create_task: {e}"
     
-# Function that prompts the AI 
-def prompt_ai(messages, nested_calls=0):
-    tools = [create_asana_task]
-    asana_chatbot = ChatOpenAI(model=model) if "gpt" in model.lower() else ChatAnthropic(model=model)
-    asana_chatbot_with_tools = asana_chatbot.bind_tools(tools)
-
-    ai_response = asana_chatbot_with_tools.invoke(messages)
-    # Only print the content of the message
-    # print(ai_response.content)
-    
-    tool_calls = len(ai_response.tool_calls) > 0
-
-    # Second, see if the AI decided it needs to invoke a tool
-    if tool_calls:
-        # If the AI decided to invoke a tool, invoke it
-        available_functions = {
-            "create_asana_task": create_asana_task
-        }
+# Builds the chat model once, importing LangChain's tool support and only the selected provider's package
+# the first time the AI is prompted
+@lru_cache(maxsize=None)
+def get_asana_chatbot():
+    from langchain_core.tools import tool
+    from common.langchain_tracing import TracingCallbackHandler
+    from common.langchain_cache import langchain_cache
+
+    # we're telling the agent that the function is a tool that it can invoke
+    asana_tool = tool(create_asana_task)
+
+    # The callback handler records every model call with its latency and token usage in the trace,
+    # and with LLM_CACHE enabled prompts that were already sent are answered from the on-disk cache.
+    # stream_usage makes OpenAI report token usage when the agent service in 06-agent-service streams the answer
+    # No single model call may take longer than a whole turn is allowed to
+    callbacks = [TracingCallbackHandler()]
+    cache = langchain_cache()
+    if "gpt" in model.lower():
+        from langchain_openai import ChatOpenAI
+        asana_chatbot = ChatOpenAI(model=model, timeout=default_max_seconds, stream_usage=True, callbacks=callbacks, cache=cache)
+    else:
+        from langchain_anthropic import ChatAnthropic
+        asana_chatbot = ChatAnthropic(model=model, timeout=default_max_seconds, callbacks=callbacks, cache=cache)
+
+    available_functions = {
+        "create_asana_task": asana_tool
+    }
+    return asana_chatbot.bind_tools([asana_tool]), available_functions
 
-        # Add the tool request to the list of messages so the AI knows later it invoked the tool
-        messages.append(ai_response)
+# Function that prompts the AI 
+def prompt_ai(messages, run=None):
+    asana_chatbot_with_tools, available_functions = get_asana_chatbot()
 
-        # Next, for each tool the AI wanted to call, call it and add the tool result to the list of messages
-        for tool_call in ai_response.tool_calls:
-            tool_name = tool_call["name"].lower()
-            selected_tool = available_functions[tool_name]
-            tool_output = selected_tool.invoke(tool_call["args"])
-            messages.append(ToolMessage(tool_output, tool_call_id=tool_call["id"]))     
-            
-        # Call the AI again so it can produce a response with the result of calling the tool(s)
-        ai_response = prompt_ai(messages, nested_calls + 1)
-        
-    return ai_response
+    # Call the AI, run the tools it asks for and call it again with their results until it gives a final answer.
+    # This is a loop with limits on steps, time and tokens rather than recursion, so a misbehaving model can't loop forever
+    return run_agent(asana_chatbot_with_tools, messages, available_functions, run)
     
 
 def main(): 
@@ -118,6 +107,9 @@ def main():
         SystemMessage(content=f"You are a personal assistant who helps manage tasks in Asana. The current date is: {datetime.now().date()}")
     ]
     
+    # Start loading the Asana SDK, users, tasks and custom fields while the user types their first message
+    threading.Thread(target=lambda: get_metadata_cache().preload(), daemon=True).start()
+
     # Loop forever and ask the user for another message to send to the AI. If I type 'q' then I quit.
     while True:
         user_input = input("Chat with AI (q to quit): ").strip()
@@ -128,11 +120,14 @@ def main():
         # Once we get the input from the users, we'll add it to the messages list. Content of the message is the user's input.
         messages.append(HumanMessage(content=user_input))
         # We'll create a function "prompt_ai" that will take the messages list and send it to the AI.
-        ai_response = prompt_ai(messages)
+        run = AgentRun()
+        with turn("asana-langchain"):
+            ai_response = prompt_ai(messages, run)
          
-        # We'll print the response then add the AI's response to the messages list.
-        print(ai_response)
-        messages.append({"role": "assistant", "content": ai_response})
+        # We'll print the response and how long each step took, then add the AI's response to the messages list.
+        print(ai_response.content)
+        print(run.report())
+        messages.append(ai_response)
     
 
 if __name__ == "__main__":
@@ -1,120 +1,94 @@
-import asana
-from asana.rest import ApiException
-from openai import OpenAI
 from dotenv import load_dotenv
 from datetime import datetime
 import json
 import os
+import sys
 import streamlit as st
 
-from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage, AIMessage
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+
+# Make the shared helpers in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.asana_tasks import create_task_with_subtasks
+from common.asana_metadata import AsanaMetadataCache
+from common.agent_loop import AgentRun, default_max_seconds, stream_agent
+from common.tracing import turn
 
 load_dotenv() 
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
 
-# Setting up Asana API client 
-configuration = asana.Configuration()
-configuration.access_token = os.getenv('ASANA_ACCESS_TOKEN', '')
-api_client = asana.ApiClient(configuration)
+# The Asana SDK is imported and its client created the first time they are needed, so the page shows up
+# without waiting for it to load. Cached with streamlit so they survive reruns
+@st.cache_resource
+def get_tasks_api():
+    import asana
+
+    # Setting up Asana API client 
+    configuration = asana.Configuration()
+    configuration.access_token = os.getenv('ASANA_ACCESS_TOKEN', '')
+    api_client = asana.ApiClient(configuration)
+
+    # Setting up Asana tasks API instance. There are a bunch of APIs that can be used to interact with Asana.
+    return asana.TasksApi(api_client)
 
-# Setting up Asana tasks API instance. There are a bunch of APIs that can be used to interact with Asana.
-tasks_api_instance = asana.TasksApi(api_client)
+# Cached users, projects, tasks and custom fields so the AI can refer to them by name instead of GID
+@st.cache_resource
+def get_metadata_cache():
+    cache = AsanaMetadataCache(get_tasks_api().api_client)
+    cache.preload()
+    return cache
 
 # Function that adds tasks to ASANA
-@tool # we're telling the agent that the function is a tool that it can invoke
 def create_asana_task(task_name, due_on="today", description=None, assignee=None, dependencies=None, custom_fields=None, subtasks=None):
     """
-    Creates a task in Asana with enhanced capabilities
+    Creates a task in Asana with enhanced capabilities.
+    The assignee can be a user's name or email, dependencies can be task names and custom_fields can use field
+    and option names, they are resolved to Asana GIDs automatically.
     """
-    if due_on == "today":
-        due_on = str(datetime.now().date())
-
-    task_body = {
-        "data": {
-            "name": task_name,
-            "due_on": due_on,
-            "projects": [os.getenv("ASANA_PROJECT_ID", "")]
-        }
-    }
-    
-    # Add optional fields if provided
-    if description:
-        task_body["data"]["notes"] = description
-    if assignee:
-        task_body["data"]["assignee"] = assignee
-    if dependencies:
-        task_body["data"]["dependencies"] = dependencies
-    if custom_fields:
-        task_body["data"]["custom_fields"] = custom_fields
+    from asana.rest import ApiException
 
     try:
-        # Create main task
-        api_response = tasks_api_instance.create_task(task_body, {})
-        task_gid = api_response['gid']
-
-         # Create subtasks if provided
-        if subtasks:
-            for subtask_name in subtasks:
-                subtask_body = {
-                    "data": {
-                        "name": subtask_name,
-                        "parent": task_gid,
-                        "projects": [os.getenv("ASANA_PROJECT_ID", "")]
-                    }
-                }
-                tasks_api_instance.create_task(subtask_body, {})
-
+        api_response = create_task_with_subtasks(
+            get_tasks_api(), get_metadata_cache(), task_name, due_on, description, assignee, dependencies, custom_fields, subtasks
+        )
         return json.dumps(api_response, indent=2)
     except ApiException as e:
         return f"Exception when calling TasksApi->create_task: {e}"
     
+# Builds the chat model once, importing LangChain's tool support and only the selected provider's package
+# the first time the AI is prompted
+@st.cache_resource
+def get_asana_chatbot():
+    from langchain_core.tools import tool
+    from common.langchain_tracing import TracingCallbackHandler
+
+    # we're telling the agent that the function is a tool that it can invoke
+    asana_tool = tool(create_asana_task)
+
+    # stream_usage makes OpenAI report token usage while streaming so the token budget can be enforced,
+    # the callback handler records every model call with its latency, time to first token and usage in the trace
+    # No single model call may take longer than a whole turn is allowed to
+    callbacks = [TracingCallbackHandler()]
+    if "gpt" in model.lower():
+        from langchain_openai import ChatOpenAI
+        asana_chatbot = ChatOpenAI(model=model, timeout=default_max_seconds, stream_usage=True, callbacks=callbacks)
+    else:
+        from langchain_anthropic import ChatAnthropic
+        asana_chatbot = ChatAnthropic(model=model, timeout=default_max_seconds, callbacks=callbacks)
+
+    available_functions = {
+        "create_asana_task": asana_tool
+    }
+    return asana_chatbot.bind_tools([asana_tool]), available_functions
+
 # Function that prompts the AI 
-def prompt_ai(messages, nested_calls=0):
-    tools = [create_asana_task]
-    asana_chatbot = ChatOpenAI(model=model) if "gpt" in model.lower() else ChatAnthropic(model=model)
-    asana_chatbot_with_tools = asana_chatbot.bind_tools(tools)
-
-    stream = asana_chatbot_with_tools.stream(messages)
-    # then loop over all chunks in the stream
-    first = True
-    for chunk in stream:
-        if first:
-            gathered = chunk
-            first = False
-        else:
-            gathered = gathered + chunk
-
-        yield chunk
-    
-    # tool calls will be in the gathered tool calls
-    has_tool_calls = len(gathered.tool_calls) > 0
-
-    # Second, see if the AI decided it needs to invoke a tool
-    if has_tool_calls:
-        # If the AI decided to invoke a tool, invoke it
-        available_functions = {
-            "create_asana_task": create_asana_task
-        }
-
-        # Add the tool request to the list of messages so the AI knows later it invoked the tool
-        messages.append(gathered)
-
-        # Next, for each tool the AI wanted to call, call it and add the tool result to the list of messages
-        for tool_call in gathered.tool_calls:
-            tool_name = tool_call["name"].lower()
-            selected_tool = available_functions[tool_name]
-            tool_output = selected_tool.invoke(tool_call["args"])
-            messages.append(ToolMessage(tool_output, tool_call_id=tool_call["id"]))     
-            
-        # Call the AI again so it can produce a response with the result of calling the tool(s)
-        additional_stream = prompt_ai(messages, nested_calls + 1)
-        for additional_chunk in additional_stream:
-            yield additional_chunk
+def prompt_ai(messages, run=None):
+    asana_chatbot_with_tools, available_functions = get_asana_chatbot()
+
+    # Stream the AI's answer, running the tools it asks for in between. This is a loop with limits on steps,
+    # time and tokens rather than recursion, so a misbehaving model can't loop forever
+    yield from stream_agent(asana_chatbot_with_tools, messages, available_functions, run)
         
 def main(): 
     # title that will appear in the ui section
@@ -140,14 +114,20 @@ def main():
         st.session_state.messages.append(HumanMessage(content=prompt))
 
         # Display assistant response in chat message container
-        with st.chat_message("assistant"):
-            stream = prompt_ai(st.session_state.messages)
-            # Extract just the content from the response
-            response = stream.content if hasattr(stream, 'content') else stream
-            st.write(response)
+        with st.chat_message("assistant"), turn("asana-langchain-ui"):
+            run = AgentRun()
+            stream = prompt_ai(st.session_state.messages, run)
+            # Stream the content of the response, write_stream returns the full text once it's done
+            response = st.write_stream(stream)
+            # Show how long each step took
+            with st.expander("Agent steps"):
+                st.text(run.report())
         
         st.session_state.messages.append(AIMessage(content=response))
 
+    # Now that the page is showing, load the Asana SDK and start loading the workspace metadata (only once)
+    get_metadata_cache()
+
     
 
 if __name__ == "__main__":
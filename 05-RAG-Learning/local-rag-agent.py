@@ -1,24 +1,29 @@
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFacePipeline, HuggingFaceEndpoint, ChatHuggingFace
-from langchain_community.embeddings.sentence_transformer import SentenceTransformerEmbeddings
 from langchain_core.messages import SystemMessage, AIMessage, HumanMessage
-from langchain_community.document_loaders import DirectoryLoader
-from langchain_text_splitters import CharacterTextSplitter
 from dotenv import load_dotenv
 from datetime import datetime
 import streamlit as st
 import json
 import tempfile
 import os
+import sys
+
+# Make the shared helpers in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.tracing import span, turn
 
 load_dotenv()
 
 model = os.getenv('LLM_MODEL', 'deepseek-ai/DeepSeek-R1')
 rag_directory = os.getenv('DIRECTORY', 'meeting_notes')
 
+# The HuggingFace, Chroma and sentence-transformers packages are heavy, so they're imported inside the functions
+# that use them and the model and vector database are only created when first needed
+
 # function for getting the model, catching it with streamlit so that it doesn't have to be loaded every time
 @st.cache_resource
 def get_local_model():
+    from langchain_huggingface import HuggingFaceEndpoint
+
     return HuggingFaceEndpoint(
         repo_id=model,
         task="text-generation",
@@ -26,10 +31,10 @@ def get_local_model():
         do_sample=False
     )
 
-# get an instance of the model 
-llm = get_local_model()
-
 def load_documents(directory):
+    from langchain_community.document_loaders import DirectoryLoader
+    from langchain_text_splitters import CharacterTextSplitter
+
     # Load the PDF or txt documents from the directory
     loader = DirectoryLoader(directory)
     documents = loader.load()
@@ -54,6 +59,9 @@ persist_directory = os.path.join(os.getcwd(), "chroma_db")
 # instantiating the vector database
 @st.cache_resource
 def get_chroma_instance():
+    from langchain_chroma import Chroma
+    from langchain_community.embeddings.sentence_transformer import SentenceTransformerEmbeddings
+
     # Get the documents split into chunks
     docs = load_documents(rag_directory)
 
@@ -72,8 +80,6 @@ def get_chroma_instance():
         persist_directory=persist_directory
     )
 
-db = get_chroma_instance()
-
 # query the database - most relevant documents are returned
 def query_documents(question):
     """
@@ -87,20 +93,35 @@ def query_documents(question):
     Returns:
         str: The list of texts (and their sources) that matched with the question the closest using RAG
     """
-    similar_docs = db.similarity_search(question, k=5)
+    with span("retrieval", "chroma", k=5) as current:
+        similar_docs = get_chroma_instance().similarity_search(question, k=5)
+        current.set(results=len(similar_docs))
     docs_formatted = list(map(lambda doc: f"Source: {doc.metadata.get('source', 'NA')}\nContent: {doc.page_content}", similar_docs))
 
     return docs_formatted
 
-def prompt_ai(messages):
+# The chat model is built once and shared, by every Streamlit session and by the agent service in 06-agent-service
+@st.cache_resource
+def get_doc_chatbot():
+    from langchain_huggingface import ChatHuggingFace
+    from common.langchain_tracing import TracingCallbackHandler
+    from common.langchain_cache import langchain_cache
+
+    # With LLM_CACHE enabled, the same question over an unchanged index is answered from the on-disk cache
+    return ChatHuggingFace(llm=get_local_model(), callbacks=[TracingCallbackHandler()], cache=langchain_cache())
+
+def build_rag_prompt(messages):
+    """Returns the messages to send to the AI: the conversation with the latest user message replaced by the retrieved context and the question"""
     # Fetch the relevant documents for the query
     user_prompt = messages[-1].content
     retrieved_context = query_documents(user_prompt)
     formatted_prompt = f"Context for answering the question:\n{retrieved_context}\nQuestion/user input:\n{user_prompt}"
 
+    return messages[:-1] + [HumanMessage(content=formatted_prompt)]
+
+def prompt_ai(messages):
     # Prompt the AI with the latest user message
-    doc_chatbot = ChatHuggingFace(llm=llm)
-    ai_response = doc_chatbot.invoke(messages[:-1] + [HumanMessage(content=formatted_prompt)])
+    ai_response = get_doc_chatbot().invoke(build_rag_prompt(messages))
 
     return ai_response
 
@@ -132,11 +153,15 @@ def main():
         st.session_state.messages.append(HumanMessage(content=prompt))
 
         # Display assistant response in chat message container
-        with st.chat_message("assistant"):
+        with st.chat_message("assistant"), turn("rag-agent"):
             ai_response = prompt_ai(st.session_state.messages)
             st.markdown(ai_response.content)
         
         st.session_state.messages.append(ai_response)
 
+    # Now that the page is showing, build the vector database and the model (only once) so they're ready for the first question
+    get_chroma_instance()
+    get_local_model()
+
 if __name__ == "__main__":
     main()     
\ No newline at end of file
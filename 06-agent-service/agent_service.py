@@ -0,0 +1,437 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from dotenv import load_dotenv
+import argparse
+import asyncio
+import contextvars
+import importlib.util
+import json
+import os
+import sqlite3
+import sys
+import time
+import uuid
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage, message_to_dict, messages_from_dict
+
+# Make the shared helpers in the repository root importable
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(root)
+from common.agent_loop import AgentRun, stream_agent
+from common.tracing import event, turn
+
+load_dotenv()
+
+# An HTTP service that serves many chat sessions with the Asana agent (03) and the RAG agent (05) from one process.
+# Every session shares the agents' model clients, Asana client, metadata cache and vector index, the conversations
+# are kept in SQLite and the answers are streamed back as Server-Sent Events.
+service_host = os.getenv("SERVICE_HOST", "127.0.0.1")
+service_port = int(os.getenv("SERVICE_PORT", "8000"))
+sessions_path = os.getenv("SERVICE_DB", "agent_sessions.sqlite3")
+# Threads running the agents (model calls, tools and SQLite), shared by all sessions
+service_workers = int(os.getenv("SERVICE_WORKERS", "32"))
+# Turns running at the same time across all sessions, the rest wait for a free slot. A session answers one
+# message at a time (a turn reads the history and appends to it), further messages to it are rejected with 429
+max_concurrent_turns = int(os.getenv("SERVICE_MAX_TURNS", "16"))
+max_body_bytes = 1024 * 1024
+# A request line or header longer than the stream's 64KiB line limit, or more headers than this, is rejected with 431
+max_headers = 100
+
+# The scripts of the agents the service can serve, relative to the repository root
+agent_paths = {
+    "asana": "03-asana-using-langchain/asana-langchain.py",
+    "rag": "05-RAG-Learning/local-rag-agent.py",
+}
+
+
+class SessionStore:
+    """
+    Chat sessions and their messages in SQLite.
+
+    Messages are stored with LangChain's message_to_dict so tool calls and tool results survive a restart.
+    The methods block, the service calls them with asyncio.to_thread.
+    """
+
+    def __init__(self, path=sessions_path):
+        self.path = path
+        with self._connect() as connection:
+            # WAL lets sessions be read while another turn is being saved
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, agent TEXT, created REAL, updated REAL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS messages (session_id TEXT, position INTEGER, message TEXT, PRIMARY KEY (session_id, position))")
+
+    @contextmanager
+    def _connect(self):
+        """Opens a connection that commits and closes when the block ends, so the store can be used from any thread"""
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def create(self, agent, system_message):
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("INSERT INTO sessions (id, agent, created, updated) VALUES (?, ?, ?, ?)", (session_id, agent, now, now))
+            connection.execute("INSERT INTO messages (session_id, position, message) VALUES (?, 0, ?)", (session_id, json.dumps(message_to_dict(system_message))))
+        return session_id
+
+    def get(self, session_id):
+        """Returns (agent, messages) of a session, or None when it doesn't exist"""
+        with self._connect() as connection:
+            row = connection.execute("SELECT agent FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            rows = connection.execute("SELECT message FROM messages WHERE session_id = ? ORDER BY position", (session_id,)).fetchall()
+        return row[0], messages_from_dict([json.loads(message) for (message,) in rows])
+
+    def append(self, session_id, messages):
+        """Adds the messages of a finished turn after the ones already saved"""
+        with self._connect() as connection:
+            position = connection.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+            connection.executemany(
+                "INSERT INTO messages (session_id, position, message) VALUES (?, ?, ?)",
+                [(session_id, position + i, json.dumps(message_to_dict(message))) for i, message in enumerate(messages)],
+            )
+            connection.execute("UPDATE sessions SET updated = ? WHERE id = ?", (time.time(), session_id))
+
+
+def load_agent_module(name):
+    """Imports an agent script by path (the folder and file names aren't valid module names)"""
+    path = os.path.join(root, agent_paths[name])
+    spec = importlib.util.spec_from_file_location(f"{name}_agent", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class AsanaAgent:
+    """The LangChain Asana agent from 03-asana-using-langchain, its model and Asana clients are built once and shared"""
+
+    def __init__(self):
+        self.module = load_agent_module("asana")
+
+    def system_message(self):
+        return SystemMessage(content=f"You are a personal assistant who helps manage tasks in Asana. The current date is: {datetime.now().date()}")
+
+    def warm_up(self):
+        self.module.get_asana_chatbot()
+        self.module.get_metadata_cache().preload()
+
+    def stream(self, messages, run):
+        chatbot_with_tools, available_functions = self.module.get_asana_chatbot()
+        yield from stream_agent(chatbot_with_tools, messages, available_functions, run)
+
+
+class RAGAgent:
+    """The RAG agent from 05-RAG-Learning, every session searches the same vector index"""
+
+    def __init__(self):
+        self.module = load_agent_module("rag")
+        # The documents and the vector database are relative to the RAG agent's folder, not to where the service runs
+        folder = os.path.dirname(os.path.join(root, agent_paths["rag"]))
+        self.module.rag_directory = os.path.join(folder, self.module.rag_directory)
+        self.module.persist_directory = os.path.join(folder, "chroma_db")
+
+    def system_message(self):
+        return SystemMessage(content=f"You are a personal assistant who answers questions based on the context provided if the provided context can answer the question. You only provide the answer to the question/user input and nothing else. The current date is: {datetime.now().date()}")
+
+    def warm_up(self):
+        self.module.get_chroma_instance()
+        self.module.get_doc_chatbot()
+
+    def stream(self, messages, run):
+        started = time.monotonic()
+        gathered = None
+        for chunk in self.module.get_doc_chatbot().stream(self.module.build_rag_prompt(messages)):
+            gathered = chunk if gathered is None else gathered + chunk
+            yield chunk
+        run.record_step(time.monotonic() - started, 0.0, gathered or AIMessage(content=""))
+
+
+agent_classes = {"asana": AsanaAgent, "rag": RAGAgent}
+
+
+def chunk_text(chunk):
+    """The text of a streamed chunk, Anthropic models stream a list of content blocks instead of a string"""
+    if isinstance(chunk.content, str):
+        return chunk.content
+    return "".join(block.get("text", "") for block in chunk.content if isinstance(block, dict))
+
+
+async def iterate_in_thread(generator):
+    """Runs a blocking generator on the service's thread pool and yields its items to the event loop as they come"""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    finished = object()
+
+    def produce():
+        try:
+            for item in generator:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+    # The copied context keeps the turn id, so the agent's spans are grouped under the service's turn
+    producer = loop.run_in_executor(None, contextvars.copy_context().run, produce)
+    while (item := await queue.get()) is not finished:
+        if isinstance(item, Exception):
+            raise item
+        yield item
+    await producer
+
+
+def answer_missing_tool_calls(messages):
+    """
+    Adds an error result for every tool call of the last AI message that has none, which happens when a tool
+    raised. The models reject a conversation with unanswered tool calls, so the session could not continue.
+    """
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], AIMessage) and messages[index].tool_calls:
+            answered = {message.tool_call_id for message in messages[index + 1:] if isinstance(message, ToolMessage)}
+            for tool_call in messages[index].tool_calls:
+                if tool_call["id"] not in answered:
+                    messages.append(ToolMessage("Error: the tool failed before returning a result", tool_call_id=tool_call["id"], status="error"))
+            return
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class AgentService:
+    """
+    Serves the agents over HTTP:
+
+    - POST /sessions {"agent": "asana"} creates a session and returns its id
+    - GET /sessions/<id> returns the session's messages
+    - POST /sessions/<id>/messages {"content": "..."} runs one turn and streams the answer as Server-Sent Events:
+      `token` events with the text as it's generated, then `done` with the full answer and the agent's steps (or `error`)
+    - GET /health
+
+    Every response closes the connection, there's no keep-alive.
+    """
+
+    def __init__(self, agents, store):
+        self.agents = agents
+        self.store = store
+        self.turn_slots = asyncio.Semaphore(max_concurrent_turns)
+        self.busy_sessions = set()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            method, path, body = await self.read_request(reader)
+            if path == "/health" and method == "GET":
+                await self.send_json(writer, 200, {"status": "ok", "agents": list(self.agents), "active_turns": len(self.busy_sessions)})
+            elif path == "/sessions" and method == "POST":
+                await self.create_session(writer, body)
+            elif path.startswith("/sessions/") and path.count("/") == 2 and method == "GET":
+                await self.get_session(writer, path.split("/")[2])
+            elif path.startswith("/sessions/") and path.endswith("/messages") and path.count("/") == 3 and method == "POST":
+                await self.send_message(writer, path.split("/")[2], body)
+            else:
+                raise HTTPError(404, f"Unknown endpoint {method} {path}")
+        except HTTPError as e:
+            await self.send_json(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_line(self, reader):
+        try:
+            return (await reader.readline()).decode("latin-1")
+        except ValueError:
+            # readline() raises ValueError (from LimitOverrunError) for a line over the stream's limit
+            raise HTTPError(431, "Request line or header too large")
+
+    async def read_request(self, reader):
+        request_line = (await self.read_line(reader)).split()
+        if len(request_line) != 3:
+            raise HTTPError(400, "Malformed request line")
+        method, path, _ = request_line
+
+        headers = {}
+        while (line := (await self.read_line(reader)).strip()):
+            if len(headers) >= max_headers:
+                raise HTTPError(431, "Too many request headers")
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length header")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length header")
+        if length > max_body_bytes:
+            raise HTTPError(413, "Request body too large")
+        try:
+            body = json.loads(await reader.readexactly(length)) if length else {}
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise HTTPError(400, "The request body isn't valid JSON")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "The request body must be a JSON object")
+        return method, path.split("?")[0].rstrip("/") or "/", body
+
+    async def send_json(self, writer, status, data):
+        payload = json.dumps(data).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        await writer.drain()
+
+    async def send_event(self, writer, event, data):
+        writer.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        await writer.drain()
+
+    async def create_session(self, writer, body):
+        agent = body.get("agent", "asana")
+        if not isinstance(agent, str) or agent not in self.agents:
+            raise HTTPError(400, f"Unknown agent {agent!r}, available: {', '.join(self.agents)}")
+        session_id = await asyncio.to_thread(self.store.create, agent, self.agents[agent].system_message())
+        await self.send_json(writer, 201, {"session_id": session_id, "agent": agent})
+
+    async def get_session(self, writer, session_id):
+        session = await asyncio.to_thread(self.store.get, session_id)
+        if session is None:
+            raise HTTPError(404, f"Unknown session {session_id}")
+        agent, messages = session
+        await self.send_json(writer, 200, {"session_id": session_id, "agent": agent, "messages": [message_to_dict(message) for message in messages]})
+
+    async def send_message(self, writer, session_id, body):
+        content = body.get("content")
+        if not isinstance(content, str) or not content.strip():
+            raise HTTPError(400, "The message needs a non-empty 'content'")
+        if session_id in self.busy_sessions:
+            raise HTTPError(429, "This session is already answering a message, wait for it to finish")
+
+        self.busy_sessions.add(session_id)
+        try:
+            session = await asyncio.to_thread(self.store.get, session_id)
+            if session is None:
+                raise HTTPError(404, f"Unknown session {session_id}")
+            agent, messages = session
+            async with self.turn_slots:
+                await self.run_turn(writer, session_id, agent, messages, content)
+        finally:
+            self.busy_sessions.discard(session_id)
+
+    async def run_turn(self, writer, session_id, agent, messages, content):
+        """
+        Streams one turn of the agent to the client and saves the turn's messages once it's finished.
+
+        The user's message and the tool calls that already ran are saved even when the agent fails, with an AI
+        message saying what went wrong, so the session's history matches what was done in Asana.
+        """
+        saved = len(messages)
+        messages.append(HumanMessage(content=content))
+        run = AgentRun()
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        # The turn still finishes and is saved when the client disconnects in the middle of it
+        connected = True
+        # The text of the model call being streamed, the answer is the last call's text: the calls before it asked
+        # for tools, whatever they said along the way was streamed to the client but isn't the answer
+        response = []
+        response_id = None
+        error = None
+        try:
+            with turn(f"agent-service-{agent}"):
+                try:
+                    async for chunk in iterate_in_thread(self.agents[agent].stream(messages, run)):
+                        if not isinstance(chunk, AIMessageChunk):
+                            continue
+                        # The chunks of one model call share its id
+                        if chunk.id != response_id:
+                            response_id, response = chunk.id, []
+                        text = chunk_text(chunk)
+                        if not text:
+                            continue
+                        response.append(text)
+                        if connected:
+                            try:
+                                await self.send_event(writer, "token", {"content": text})
+                            except ConnectionError:
+                                connected = False
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+        finally:
+            answer = "".join(response)
+            if error:
+                answer = (answer + "\n\n" if answer else "") + f"Sorry, something went wrong while answering: {error}"
+                answer_missing_tool_calls(messages)
+            messages.append(AIMessage(content=answer))
+            await asyncio.to_thread(self.store.append, session_id, messages[saved:])
+
+        if not connected:
+            return
+        if error:
+            await self.send_event(writer, "error", {"error": error, "content": answer})
+        else:
+            await self.send_event(writer, "done", {"content": answer, "stop_reason": run.stop_reason, "steps": run.steps, "report": run.report()})
+
+
+async def start_service(agent_names, host=service_host, port=service_port, store=None):
+    """Loads the agents and starts serving, returns the asyncio server and the service"""
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=service_workers))
+
+    # Importing the agents loads LangChain and the model providers, so it happens off the event loop
+    agents = {}
+    for name in agent_names:
+        agents[name] = await asyncio.to_thread(agent_classes[name])
+    store = store or await asyncio.to_thread(SessionStore)
+    service = AgentService(agents, store)
+
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    return server, service
+
+
+async def serve(agent_names, host, port, warm_up):
+    server, service = await start_service(agent_names, host, port)
+    print(f"Serving the {', '.join(service.agents)} agent(s) on http://{host}:{server.sockets[0].getsockname()[1]}")
+
+    # Build the models, the Asana metadata cache and the vector index before the first message instead of during it.
+    # A failed warm-up isn't fatal, the first message builds what's missing, but it's reported rather than lost
+    def warm_up_done(name, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        event("service", "warm_up", error=error, agent=name)
+        if error is not None:
+            print(f"Warming up the {name} agent failed, it will be set up on the first message: {type(error).__name__}: {error}", file=sys.stderr)
+
+    if warm_up:
+        for name, agent in service.agents.items():
+            future = asyncio.get_running_loop().run_in_executor(None, agent.warm_up)
+            future.add_done_callback(lambda future, name=name: warm_up_done(name, future))
+
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-session HTTP service for the Asana and RAG agents")
+    parser.add_argument("--agents", default="asana,rag", help="Comma separated agents to serve")
+    parser.add_argument("--host", default=service_host)
+    parser.add_argument("--port", type=int, default=service_port)
+    parser.add_argument("--no-warm-up", action="store_true", help="Don't build the models and indexes until the first message")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.agents.split(","), args.host, args.port, not args.no_warm_up))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import time
+
+# Make the shared helpers in the repository root importable
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(root)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from stub_servers import start_openai_stub, start_asana_stub, start_github_stub
+
+# Entry points of the agents that can be benchmarked, relative to the repository root
+agent_paths = {
+    "asana-agent": "01-asana-agent/agents.py",
+    "asana-langchain": "03-asana-using-langchain/asana-langchain.py",
+    "github-agent": "02-github-agent/github_agent.py",
+}
+
+
+def load_agent(name):
+    """Imports an agent script by path (the folder and file names aren't valid module names)"""
+    path = os.path.join(root, agent_paths[name])
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def setup_environment(openai_stub, trace):
+    """Points the agents at the local stand-ins, must run before the agents are imported"""
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["OPENAI_BASE_URL"] = f"{openai_stub.url}/v1"
+    os.environ["OPENAI_API_BASE"] = f"{openai_stub.url}/v1"
+    os.environ["OPENAI_MODEL"] = "gpt-benchmark"
+    os.environ["ASANA_ACCESS_TOKEN"] = "benchmark"
+    os.environ["ASANA_PROJECT_ID"] = "1"
+    os.environ["GITHUB_TOKEN"] = "benchmark"
+    if not trace:
+        os.environ["AGENT_TRACE_FILE"] = ""
+
+
+def prepare_agent(name, module, asana_stub, github_stub):
+    """Connects an imported agent to the fake Asana/GitHub servers and returns a function that runs one turn"""
+    if name in ("asana-agent", "asana-langchain"):
+        module.get_tasks_api().api_client.configuration.host = asana_stub.url
+
+    if name == "asana-agent":
+        def run_turn(history, prompt):
+            messages = [{"role": "system", "content": "You are a personal assistant who helps manage tasks in Asana."}]
+            for user_message, ai_message in history:
+                messages += [{"role": "user", "content": user_message}, {"role": "assistant", "content": ai_message}]
+            messages.append({"role": "user", "content": prompt})
+            return module.prompt_ai(messages)
+        return run_turn
+
+    from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+
+    if name == "github-agent":
+        from github import Github
+        module.g = Github(base_url=github_stub.url, login_or_token="benchmark")
+        module.repo = module.g.get_repo("benchmark/repo")
+        module.st.session_state.openai_key = "benchmark"
+
+    def run_turn(history, prompt):
+        messages = [SystemMessage(content="You are a personal assistant.")]
+        for user_message, ai_message in history:
+            messages += [HumanMessage(content=user_message), AIMessage(content=ai_message)]
+        messages.append(HumanMessage(content=prompt))
+        return module.prompt_ai(messages)
+    return run_turn
+
+
+def busy_time(servers, started, ended):
+    """Time between started and ended that at least one stub server was handling a request"""
+    intervals = sorted(
+        (max(start, started), min(end, ended))
+        for server in servers
+        for start, end in server.take_busy()
+        if end > started and start < ended
+    )
+
+    total = 0.0
+    current_start, current_end = None, None
+    for start, end in intervals:
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def benchmark(run_turn, servers, openai_stub, fanout, history_length, turns):
+    """Runs `turns` turns and returns their wall-clock times and the part of them spent outside the stub servers"""
+    openai_stub.fanout = fanout
+    history = [(f"Earlier request {i}: create a task for item {i}", f"Created the task for item {i}.") for i in range(history_length)]
+    prompt = f"Create {fanout} task(s) for this sprint"
+
+    durations, overheads = [], []
+    for _ in range(turns):
+        for server in servers:
+            server.take_busy()
+        started = time.perf_counter()
+        run_turn(history, prompt)
+        ended = time.perf_counter()
+        durations.append(ended - started)
+        overheads.append(ended - started - busy_time(servers, started, ended))
+
+    return durations, overheads
+
+
+def _p95(values):
+    return sorted(values)[max(0, round(0.95 * len(values)) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the agents' prompt_ai loops against local stand-ins for OpenAI, Asana and GitHub")
+    parser.add_argument("--agents", default=",".join(agent_paths), help="Comma separated agents to benchmark")
+    parser.add_argument("--turns", type=int, default=20, help="Turns per configuration")
+    parser.add_argument("--fanout", default="1,4,16", help="Comma separated numbers of tool calls per model response")
+    parser.add_argument("--history", default="0,20,100", help="Comma separated numbers of earlier user/assistant exchanges in the conversation")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the OpenAI stub takes per request")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="Seconds the Asana/GitHub stubs take per request")
+    parser.add_argument("--trace", action="store_true", help="Keep writing agent_trace.jsonl while benchmarking")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    openai_stub = start_openai_stub(args.llm_latency)
+    asana_stub = start_asana_stub(args.api_latency)
+    github_stub = start_github_stub(args.api_latency)
+    servers = [openai_stub, asana_stub, github_stub]
+    setup_environment(openai_stub, args.trace)
+
+    results = []
+    print(f"{'agent':<18} {'fanout':>6} {'history':>7} {'turns/s':>8} {'p50 turn ms':>12} {'p95 turn ms':>12} {'p50 overhead ms':>16}")
+    for name in args.agents.split(","):
+        run_turn = prepare_agent(name, load_agent(name), asana_stub, github_stub)
+        # Warm up imports and connection pools before measuring
+        benchmark(run_turn, servers, openai_stub, 1, 0, 1)
+
+        for fanout in [int(value) for value in args.fanout.split(",")]:
+            for history_length in [int(value) for value in args.history.split(",")]:
+                durations, overheads = benchmark(run_turn, servers, openai_stub, fanout, history_length, args.turns)
+                result = {
+                    "agent": name,
+                    "fanout": fanout,
+                    "history": history_length,
+                    "turns_per_second": len(durations) / sum(durations),
+                    "p50_turn_ms": statistics.median(durations) * 1000,
+                    "p95_turn_ms": _p95(durations) * 1000,
+                    "p50_overhead_ms": statistics.median(overheads) * 1000,
+                }
+                results.append(result)
+                print(f"{name:<18} {fanout:>6} {history_length:>7} {result['turns_per_second']:>8.2f} {result['p50_turn_ms']:>12.1f} {result['p95_turn_ms']:>12.1f} {result['p50_overhead_ms']:>16.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Measures how long each agent's entry point takes to import (what the user waits for before the prompt or page
+# shows up) using `python -X importtime`, and which top-level imports account for it
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+entry_points = {
+    "asana-agent": "01-asana-agent/agents.py",
+    "asana-bulk-import": "01-asana-agent/bulk_import.py",
+    "github-agent": "02-github-agent/github_agent.py",
+    "asana-langchain": "03-asana-using-langchain/asana-langchain.py",
+    "asana-langchain-ui": "04-creating-ai-agents-interface/asana-langchain-with-ui.py",
+    "rag-agent": "05-RAG-Learning/local-rag-agent.py",
+}
+
+# Imports the script without running main(), since __name__ isn't "__main__"
+loader = """
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location("entry_point", sys.argv[1])
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+"""
+
+
+def parse_importtime(stderr):
+    """Returns the cumulative microseconds of each top-level import from `-X importtime` output"""
+    top_level = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, package = line[len("import time:"):].split("|")
+        # Nested imports are indented, top-level ones have a single leading space
+        if package.startswith("  "):
+            continue
+        top_level[package.strip()] = top_level.get(package.strip(), 0) + int(cumulative)
+    return top_level
+
+
+def measure(path):
+    """Imports the entry point in a fresh interpreter and returns its wall time and top-level import times"""
+    environment = dict(os.environ, AGENT_TRACE_FILE="")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", loader, path],
+        cwd=os.path.dirname(path), env=environment, capture_output=True, text=True,
+    )
+    wall_seconds = time.perf_counter() - started
+
+    if result.returncode != 0:
+        error = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        return {"error": error[-1] if error else f"exit code {result.returncode}"}
+
+    imports = parse_importtime(result.stderr)
+    return {
+        "wall_ms": round(wall_seconds * 1000, 1),
+        "import_ms": round(sum(imports.values()) / 1000, 1),
+        "heaviest": sorted(((name, round(us / 1000, 1)) for name, us in imports.items()), key=lambda item: -item[1])[:5],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup (import time) benchmark of the agents' entry points")
+    parser.add_argument("--entry-points", default=",".join(entry_points), help="Comma separated entry points to measure")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per entry point, the fastest one is reported")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.entry_points.split(","):
+        path = os.path.abspath(os.path.join(root, entry_points[name]))
+        runs = [measure(path) for _ in range(args.runs)]
+        failed = [run for run in runs if "error" in run]
+        result = failed[0] if failed else min(runs, key=lambda run: run["wall_ms"])
+        results[name] = result
+
+        if "error" in result:
+            print(f"{name:<20} could not be imported: {result['error']}")
+            continue
+        heaviest = ", ".join(f"{package} {ms:.0f}ms" for package, ms in result["heaviest"])
+        print(f"{name:<20} wall {result['wall_ms']:>8.1f}ms  imports {result['import_ms']:>8.1f}ms  heaviest: {heaviest}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Make the shared helpers in the repository root importable
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(root)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from stub_servers import start_openai_stub, start_asana_stub
+from agent_benchmark import setup_environment, _p95
+
+# Load test of the agent service in 06-agent-service: many sessions chatting with the Asana agent at once, with
+# the local OpenAI and Asana stand-ins instead of the real APIs
+
+
+def load_service():
+    """Imports the service by path, it must run after the environment points at the stubs"""
+    spec = importlib.util.spec_from_file_location("agent_service", os.path.join(root, "06-agent-service/agent_service.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def request(port, method, path, body=None):
+    """Sends one request to the service and returns the status and the raw response body (the service closes every connection)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode("latin-1") + payload)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    while (await reader.readline()).strip():
+        pass
+    return status, reader, writer
+
+
+async def create_session(port):
+    status, reader, writer = await request(port, "POST", "/sessions", {"agent": "asana"})
+    body = json.loads(await reader.read())
+    writer.close()
+    return body["session_id"]
+
+
+async def send_message(port, session_id, content):
+    """Sends a message and reads the streamed answer, returns (status, time to first token, total time, final event)"""
+    started = time.perf_counter()
+    first_token = None
+    event = None
+    status, reader, writer = await request(port, "POST", f"/sessions/{session_id}/messages", {"content": content})
+    if status == 200:
+        async for line in reader:
+            line = line.decode("utf-8").strip()
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                if event == "token" and first_token is None:
+                    first_token = time.perf_counter() - started
+    else:
+        await reader.read()
+    writer.close()
+    return status, first_token, time.perf_counter() - started, event
+
+
+async def chat(port, session_id, turns, fanout):
+    results = []
+    for turn_number in range(turns):
+        results.append(await send_message(port, session_id, f"Create {fanout} task(s) for sprint item {turn_number}"))
+    return results
+
+
+async def benchmark(port, sessions, turns, fanout):
+    """Runs `turns` turns in each of `sessions` sessions at the same time and returns the per-turn results and the wall time"""
+    session_ids = await asyncio.gather(*(create_session(port) for _ in range(sessions)))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(chat(port, session_id, turns, fanout) for session_id in session_ids))
+    return [result for session in results for result in session], time.perf_counter() - started
+
+
+async def session_limit_check(port):
+    """Sends two messages to one session at the same time, the second one should be rejected with 429"""
+    session_id = await create_session(port)
+    results = await asyncio.gather(send_message(port, session_id, "Create a task"), send_message(port, session_id, "Create another task"))
+    return sorted(status for status, _, _, _ in results)
+
+
+async def run(args):
+    openai_stub = start_openai_stub(args.llm_latency)
+    asana_stub = start_asana_stub(args.api_latency)
+    setup_environment(openai_stub, args.trace)
+    os.environ["SERVICE_DB"] = os.path.join(tempfile.mkdtemp(), "agent_sessions.sqlite3")
+
+    service_module = load_service()
+    server, service = await service_module.start_service(["asana"], "127.0.0.1", 0)
+    service.agents["asana"].module.get_tasks_api().api_client.configuration.host = asana_stub.url
+    port = server.sockets[0].getsockname()[1]
+
+    openai_stub.fanout = args.fanout
+    # Warm up imports, the metadata cache and connection pools before measuring
+    await benchmark(port, 1, 1, args.fanout)
+    print(f"Concurrent messages to one session: {await session_limit_check(port)} (200 and 429 expected)")
+
+    results = []
+    print(f"{'sessions':>8} {'turns':>6} {'turns/s':>8} {'p50 ttft ms':>12} {'p50 turn ms':>12} {'p95 turn ms':>12} {'errors':>7}")
+    for sessions in [int(value) for value in args.sessions.split(",")]:
+        turns, wall_seconds = await benchmark(port, sessions, args.turns, args.fanout)
+        completed = [turn for turn in turns if turn[0] == 200 and turn[3] == "done"]
+        durations = [turn[2] for turn in completed] or [0.0]
+        ttfts = [turn[1] for turn in completed if turn[1] is not None] or [0.0]
+        result = {
+            "sessions": sessions,
+            "turns": len(turns),
+            "turns_per_second": len(completed) / wall_seconds,
+            "p50_ttft_ms": statistics.median(ttfts) * 1000,
+            "p50_turn_ms": statistics.median(durations) * 1000,
+            "p95_turn_ms": _p95(durations) * 1000,
+            "errors": len(turns) - len(completed),
+        }
+        results.append(result)
+        print(f"{sessions:>8} {len(turns):>6} {result['turns_per_second']:>8.2f} {result['p50_ttft_ms']:>12.1f} {result['p50_turn_ms']:>12.1f} {result['p95_turn_ms']:>12.1f} {result['errors']:>7}")
+
+    server.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the agent service against local stand-ins for OpenAI and Asana")
+    parser.add_argument("--sessions", default="1,8,32", help="Comma separated numbers of sessions chatting at the same time")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per session")
+    parser.add_argument("--fanout", type=int, default=2, help="Tool calls per model response")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the OpenAI stub takes per request")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="Seconds the Asana stub takes per request")
+    parser.add_argument("--trace", action="store_true", help="Keep writing agent_trace.jsonl while benchmarking")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlparse
+import itertools
+import json
+import threading
+import time
+
+# Local stand-ins for the OpenAI, Asana and GitHub REST APIs so the agents can be benchmarked without spending
+# real API quota. Each server sleeps for a configurable latency per request and records when it was busy, so the
+# benchmark can tell the time spent "in the network" apart from the agent's own overhead.
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler, latency=0.0):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.latency = latency
+        self.busy = []
+        self.busy_lock = threading.Lock()
+        self.ids = itertools.count(1000000)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def record_busy(self, started, ended):
+        with self.busy_lock:
+            self.busy.append((started, ended))
+
+    def take_busy(self):
+        """Returns and clears the (start, end) intervals the server spent handling requests"""
+        with self.busy_lock:
+            busy, self.busy = self.busy, []
+        return busy
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, without this Nagle + delayed ACKs add ~40ms per request
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_json(self, method):
+        started = time.perf_counter()
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        time.sleep(self.server.latency)
+        status, response = self.route(method, urlparse(self.path).path, body)
+
+        # Routes return a string for Server-Sent Events (streamed responses), anything else is sent as JSON
+        if isinstance(response, str):
+            payload, content_type = response.encode("utf-8"), "text/event-stream"
+        else:
+            payload, content_type = json.dumps(response).encode("utf-8"), "application/json"
+        self.server.record_busy(started, time.perf_counter())
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self.handle_json("GET")
+
+    def do_POST(self):
+        self.handle_json("POST")
+
+    def route(self, method, path, body):
+        raise NotImplementedError
+
+
+class OpenAIHandler(JSONHandler):
+    """
+    OpenAI compatible /chat/completions endpoint returning scripted tool calls.
+
+    When the last message comes from the user it answers with `fanout` calls to the first tool in the request,
+    once the tool results are in it answers with plain text, like a model would after running the tools.
+    Requests with `stream` get the same answer as chat.completion.chunk events.
+    """
+
+    def route(self, method, path, body):
+        if not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": f"Unknown path {path}"}}
+
+        last_message = body["messages"][-1]
+        tools = body.get("tools") or []
+        if last_message["role"] == "user" and tools:
+            tool_name = tools[0]["function"]["name"]
+            tool_calls = [
+                {"id": f"call_{next(self.server.ids)}", "type": "function", "function": {"name": tool_name, "arguments": json.dumps(self.server.tool_args(tool_name, next(self.server.ids)))}}
+                for _ in range(self.server.fanout)
+            ]
+            message = {"role": "assistant", "content": None, "tool_calls": tool_calls}
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": "Done! Everything you asked for has been created."}
+            finish_reason = "stop"
+
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in body["messages"]) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20}
+        completion = {"id": f"chatcmpl-{next(self.server.ids)}", "created": int(time.time()), "model": body["model"]}
+        if body.get("stream"):
+            return 200, self.stream_events(completion, message, finish_reason, usage, body.get("stream_options") or {})
+        return 200, dict(completion, object="chat.completion", usage=usage, choices=[{"index": 0, "message": message, "finish_reason": finish_reason}])
+
+    def stream_events(self, completion, message, finish_reason, usage, stream_options):
+        """The answer as Server-Sent Events: the content word by word or the tool calls, then the finish reason and usage"""
+        deltas = [{"role": "assistant", "content": ""}]
+        if message["content"]:
+            deltas += [{"content": word + " "} for word in message["content"].split(" ")]
+        for index, tool_call in enumerate(message.get("tool_calls") or []):
+            deltas.append({"tool_calls": [dict(tool_call, index=index)]})
+
+        chunk = dict(completion, object="chat.completion.chunk")
+        chunks = [dict(chunk, choices=[{"index": 0, "delta": delta, "finish_reason": None}]) for delta in deltas]
+        chunks.append(dict(chunk, choices=[{"index": 0, "delta": {}, "finish_reason": finish_reason}]))
+        if stream_options.get("include_usage"):
+            chunks.append(dict(chunk, choices=[], usage=usage))
+        return "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+
+
+def _default_tool_args(tool_name, n):
+    # Unique names so the Asana client's deduplication doesn't skip the requests being benchmarked
+    if tool_name == "create_asana_task":
+        return {"task_name": f"Benchmark task {n}", "due_on": "2030-01-01"}
+    return {"title": f"Benchmark issue {n}", "body": "Created by the offline benchmark"}
+
+
+class AsanaHandler(JSONHandler):
+    """
+    The subset of the Asana REST API the agents use: creating and listing tasks and listing workspace metadata.
+
+    Created tasks are kept in `server.tasks` so they can be listed by project or parent. Each entry of
+    `server.failures` makes the next task creation answer 503, "before" without creating the task and "after"
+    once it's created, like a request Asana processed but couldn't answer.
+    """
+
+    def route(self, method, path, body):
+        path = path.replace("/api/1.0", "")
+        query = parse_qs(urlparse(self.path).query)
+        if method == "POST" and path == "/tasks":
+            failure = self.server.failures.pop(0) if self.server.failures else None
+            if failure == "before":
+                return 503, {"errors": [{"message": "Service unavailable"}]}
+
+            created_at = datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+            data = dict(body["data"], gid=str(next(self.server.ids)), resource_type="task", created_at=created_at)
+            self.server.tasks.append(data)
+            if failure == "after":
+                return 503, {"errors": [{"message": "Service unavailable"}]}
+            return 201, {"data": data}
+        if method == "GET" and path.startswith("/projects/") and path.count("/") == 2:
+            return 200, {"data": {"gid": path.split("/")[2], "workspace": {"gid": "1"}}}
+        if method == "GET" and path == "/tasks" and "project" in query:
+            tasks = [task for task in self.server.tasks if query["project"][0] in task.get("projects", []) and not task.get("parent")]
+            return 200, {"data": tasks, "next_page": None}
+        if method == "GET" and path.startswith("/tasks/") and path.endswith("/subtasks"):
+            tasks = [task for task in self.server.tasks if task.get("parent") == path.split("/")[2]]
+            return 200, {"data": tasks, "next_page": None}
+        if method == "GET":
+            # The other list endpoints (users, projects, custom field settings) are empty
+            return 200, {"data": [], "next_page": None}
+        return 404, {"errors": [{"message": f"Unknown path {path}"}]}
+
+
+class GitHubHandler(JSONHandler):
+    """The subset of the GitHub REST API the GitHub agent uses: the repository, issues, pull requests and commits"""
+
+    def route(self, method, path, body):
+        parts = path.strip("/").split("/")
+        if parts[0] != "repos" or len(parts) < 3:
+            return 404, {"message": "Not Found"}
+
+        repo_url = f"{self.server.url}/repos/{parts[1]}/{parts[2]}"
+        if method == "GET" and len(parts) == 3:
+            return 200, {"id": 1, "name": parts[2], "full_name": f"{parts[1]}/{parts[2]}", "url": repo_url}
+        if method == "GET" and parts[3] == "commits":
+            return 200, []
+        if method == "POST" and parts[3] in ("issues", "pulls"):
+            number = next(self.server.ids)
+            return 201, {
+                "id": number,
+                "number": number,
+                "title": body["title"],
+                "body": body.get("body"),
+                "state": "open",
+                "url": f"{repo_url}/{parts[3]}/{number}",
+                "html_url": f"https://github.com/{parts[1]}/{parts[2]}/{parts[3]}/{number}",
+            }
+        return 404, {"message": "Not Found"}
+
+
+def start_openai_stub(latency=0.0, fanout=1, tool_args=_default_tool_args):
+    server = StubServer(OpenAIHandler, latency)
+    server.fanout = fanout
+    server.tool_args = tool_args
+    return server.start()
+
+
+def start_asana_stub(latency=0.0):
+    server = StubServer(AsanaHandler, latency)
+    server.tasks = []
+    server.failures = []
+    return server.start()
+
+
+def start_github_stub(latency=0.0):
+    return StubServer(GitHubHandler, latency).start()
@@ -0,0 +1,2 @@
+# Helpers shared by the agents in the numbered folders.
+# Scripts add the repository root to sys.path and import from here, e.g. `from common.asana_tasks import build_task_body`
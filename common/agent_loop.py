@@ -0,0 +1,168 @@
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+import json
+import os
+import time
+
+from common.tracing import span
+
+# Default limits for a single user turn, can be overridden per agent through environment variables
+default_max_steps = int(os.getenv("AGENT_MAX_STEPS", "10"))
+default_max_seconds = float(os.getenv("AGENT_MAX_SECONDS", "120"))
+default_max_tokens = int(os.getenv("AGENT_MAX_TOKENS", "50000"))
+
+stop_messages = {
+    "max_steps": "I stopped because I reached the maximum number of steps for one request.",
+    "timeout": "I stopped because this request took longer than the time allowed.",
+    "max_tokens": "I stopped because this request used up its token budget.",
+    "repeated_tool_call": "I stopped because I was repeating the same action with the same details.",
+}
+
+
+class AgentRun:
+    """
+    Limits and per-step timings for one user turn of the agent loop.
+
+    A step is one call to the model plus the tools it asked for. The run stops after `max_steps` steps,
+    `max_seconds` of wall-clock time or `max_tokens` tokens, whichever comes first.
+
+    The limits are checked between steps, so a run can go over `max_seconds` by the step that is running. Create
+    the models with `timeout=default_max_seconds` so a single hung model call can't take longer than a whole run.
+    """
+
+    def __init__(self, max_steps=None, max_seconds=None, max_tokens=None):
+        self.max_steps = max_steps or default_max_steps
+        self.max_seconds = max_seconds or default_max_seconds
+        self.max_tokens = max_tokens or default_max_tokens
+        self.started = time.monotonic()
+        self.total_tokens = 0
+        self.steps = []
+        self.stop_reason = None
+        self.seen_tool_calls = set()
+
+    def limit_reached(self):
+        """Returns the reason the run has to stop before calling the model again, or None"""
+        if len(self.steps) >= self.max_steps:
+            return "max_steps"
+        if time.monotonic() - self.started >= self.max_seconds:
+            return "timeout"
+        if self.total_tokens >= self.max_tokens:
+            return "max_tokens"
+        return None
+
+    def is_repeat(self, tool_calls):
+        """True when every tool call was already made with identical arguments earlier in this run"""
+        keys = {(tool_call["name"], json.dumps(tool_call["args"], sort_keys=True)) for tool_call in tool_calls}
+        repeat = keys <= self.seen_tool_calls
+        self.seen_tool_calls |= keys
+        return repeat
+
+    def record_step(self, llm_seconds, tool_seconds, ai_message):
+        usage = getattr(ai_message, "usage_metadata", None) or {}
+        tokens = usage.get("total_tokens", 0)
+        self.total_tokens += tokens
+        self.steps.append({
+            "step": len(self.steps) + 1,
+            "llm_seconds": round(llm_seconds, 3),
+            "tool_seconds": round(tool_seconds, 3),
+            "tool_calls": [tool_call["name"] for tool_call in ai_message.tool_calls],
+            "tokens": tokens,
+        })
+
+    def report(self):
+        """Human readable summary of the run, one line per step"""
+        total_seconds = time.monotonic() - self.started
+        lines = [f"{len(self.steps)} step(s), {total_seconds:.2f}s, {self.total_tokens} tokens" + (f", stopped: {self.stop_reason}" if self.stop_reason else "")]
+        for step in self.steps:
+            tools = ", ".join(step["tool_calls"]) or "-"
+            lines.append(f"  step {step['step']}: llm {step['llm_seconds']:.2f}s, tools {step['tool_seconds']:.2f}s ({tools}), {step['tokens']} tokens")
+        return "\n".join(lines)
+
+
+def _run_tools(ai_message, messages, available_functions):
+    """Calls every tool the model asked for and adds the results to the messages"""
+    messages.append(ai_message)
+    for tool_call in ai_message.tool_calls:
+        tool_name = tool_call["name"].lower()
+        selected_tool = available_functions.get(tool_name)
+        if selected_tool is None:
+            # Tell the model instead of failing the turn, it can pick one of the real tools on the next step
+            tool_output = f"Error: there is no tool named {tool_call['name']!r}, the available tools are: {', '.join(available_functions)}"
+            messages.append(ToolMessage(tool_output, tool_call_id=tool_call["id"], status="error"))
+            continue
+        try:
+            with span("tool", tool_name):
+                tool_output = selected_tool.invoke(tool_call["args"])
+        except Exception as e:
+            # Invalid arguments or a failing tool are reported to the model as well, the span recorded the error
+            messages.append(ToolMessage(f"Error: {type(e).__name__}: {e}", tool_call_id=tool_call["id"], status="error"))
+            continue
+        messages.append(ToolMessage(tool_output, tool_call_id=tool_call["id"]))
+
+
+def stream_agent(chatbot_with_tools, messages, available_functions, run=None):
+    """
+    Runs the agent loop iteratively, yielding the model's message chunks as they stream in.
+
+    Tool calls are run between model calls until the model answers without calling a tool, or the run's limits
+    are reached, in which case a chunk explaining why is yielded. Tool requests and results are appended to
+    `messages`, the final answer is not.
+    """
+    run = run or AgentRun()
+
+    while True:
+        run.stop_reason = run.limit_reached()
+        if run.stop_reason:
+            yield AIMessageChunk(content=stop_messages[run.stop_reason])
+            return
+
+        llm_started = time.monotonic()
+        gathered = None
+        for chunk in chatbot_with_tools.stream(messages):
+            gathered = chunk if gathered is None else gathered + chunk
+            yield chunk
+        llm_seconds = time.monotonic() - llm_started
+
+        if gathered is None or not gathered.tool_calls:
+            run.record_step(llm_seconds, 0.0, gathered or AIMessage(content=""))
+            return
+
+        if run.is_repeat(gathered.tool_calls):
+            run.record_step(llm_seconds, 0.0, gathered)
+            run.stop_reason = "repeated_tool_call"
+            yield AIMessageChunk(content=stop_messages[run.stop_reason])
+            return
+
+        tools_started = time.monotonic()
+        _run_tools(gathered, messages, available_functions)
+        run.record_step(llm_seconds, time.monotonic() - tools_started, gathered)
+
+
+def run_agent(chatbot_with_tools, messages, available_functions, run=None):
+    """
+    Runs the agent loop iteratively and returns the model's final AIMessage.
+
+    Same as stream_agent but without streaming: when a limit is reached an AIMessage explaining why is returned.
+    """
+    run = run or AgentRun()
+
+    while True:
+        run.stop_reason = run.limit_reached()
+        if run.stop_reason:
+            return AIMessage(content=stop_messages[run.stop_reason])
+
+        llm_started = time.monotonic()
+        ai_response = chatbot_with_tools.invoke(messages)
+        llm_seconds = time.monotonic() - llm_started
+
+        if not ai_response.tool_calls:
+            run.record_step(llm_seconds, 0.0, ai_response)
+            return ai_response
+
+        if run.is_repeat(ai_response.tool_calls):
+            run.record_step(llm_seconds, 0.0, ai_response)
+            run.stop_reason = "repeated_tool_call"
+            return AIMessage(content=stop_messages[run.stop_reason])
+
+        tools_started = time.monotonic()
+        _run_tools(ai_response, messages, available_functions)
+        run.record_step(llm_seconds, time.monotonic() - tools_started, ai_response)
@@ -0,0 +1,226 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import hashlib
+import os
+import random
+import threading
+import time
+
+from common.tracing import span
+
+# How many times a request is retried after being throttled or failing on Asana's side
+max_retries = int(os.getenv("ASANA_MAX_RETRIES", "5"))
+# Asana allows 15 concurrent write requests per token, stay within that across all threads of the process
+max_in_flight = int(os.getenv("ASANA_MAX_IN_FLIGHT", "15"))
+# Seconds to wait for Asana to accept the connection and to answer, so a hung request can't hold an in-flight slot forever
+request_timeout = (float(os.getenv("ASANA_CONNECT_TIMEOUT", "10")), float(os.getenv("ASANA_READ_TIMEOUT", "60")))
+# Created tasks are remembered for deduplication for this many seconds, and at most this many of them
+dedup_ttl = int(os.getenv("ASANA_DEDUP_TTL", "600"))
+dedup_max_entries = int(os.getenv("ASANA_DEDUP_MAX_ENTRIES", "10000"))
+# How far Asana's clock may be behind ours when checking whether a task was created by a failed request
+clock_skew = float(os.getenv("ASANA_CLOCK_SKEW", "2"))
+
+# One semaphore per access token, so every caller sharing a token shares its in-flight budget
+_token_semaphores = {}
+_token_semaphores_lock = threading.Lock()
+
+# Tasks recently created in this process, keyed by their idempotency key, so a retried tool call returns the
+# existing task instead of creating a duplicate. Oldest first: key -> (created at, task)
+_created_tasks = OrderedDict()
+# One lock per key being created, with the number of threads using it so it can be dropped afterwards
+_dedup_locks = {}
+_dedup_lock = threading.Lock()
+
+
+def _semaphore_for(api_client):
+    token = api_client.configuration.access_token
+    with _token_semaphores_lock:
+        if token not in _token_semaphores:
+            _token_semaphores[token] = threading.BoundedSemaphore(max_in_flight)
+        return _token_semaphores[token]
+
+
+def _retry_delay(exception, attempt):
+    """Seconds to wait before the next attempt, using Retry-After when Asana sends it"""
+    headers = getattr(exception, "headers", None) or {}
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    # Exponential backoff with full jitter: 0-1s, 0-2s, 0-4s, ... capped at 30s
+    return random.uniform(0, min(30.0, 2 ** attempt))
+
+
+def _is_retryable(exception):
+    status = getattr(exception, "status", None)
+    # No status (a urllib3 error) or status 0 (how the SDK reports the ones it wraps) means the request never
+    # got a response: connection error or timeout
+    return not status or status == 429 or status >= 500
+
+
+def call_asana(api_client, function, *args, on_retry=None, before_request=None, **kwargs):
+    """
+    Calls an Asana API method, e.g. `call_asana(api_client, tasks_api.create_task, body, {})`.
+
+    Rate limited (429), server side (5xx) and connection failures are retried with backoff, honoring Retry-After,
+    and the number of requests in flight for the client's token is capped. Every attempt gets `request_timeout`
+    as `_request_timeout` unless kwargs set one. `before_request()` is called before each attempt (e.g. to wait
+    for a rate limiter) and `on_retry(exception)` before each retry, it can return a result to stop retrying
+    (used to detect tasks that were created despite an error).
+    Raises the last ApiException when all the retries fail, connection failures are raised as an ApiException
+    with status 0.
+    """
+    # The Asana SDK is imported where it's used so the agents start without loading it
+    from asana.rest import ApiException
+    import urllib3
+
+    semaphore = _semaphore_for(api_client)
+    kwargs.setdefault("_request_timeout", request_timeout)
+
+    for attempt in range(max_retries + 1):
+        try:
+            if before_request:
+                before_request()
+            with semaphore, span("asana", getattr(function, "__name__", "call"), attempt=attempt):
+                return function(*args, **kwargs)
+        except (ApiException, urllib3.exceptions.HTTPError) as e:
+            if not _is_retryable(e) or attempt == max_retries:
+                if isinstance(e, ApiException):
+                    raise
+                raise ApiException(status=0, reason=f"{type(e).__name__}: {e}") from e
+            time.sleep(_retry_delay(e, attempt))
+            if on_retry:
+                result = on_retry(e)
+                if result is not None:
+                    return result
+
+
+def task_dedup_key(task_body):
+    """Client-side idempotency key for a task: the same name, due date, parent and projects is the same task"""
+    data = task_body["data"]
+    parts = [data.get("name", ""), data.get("due_on") or "", data.get("parent") or "", ",".join(data.get("projects", []))]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _find_existing_task(api_client, tasks_api, task_body, before_request=None, exclude_gids=(), created_after=None):
+    """
+    Looks for a task that matches task_body, in case an earlier attempt was created before failing.
+
+    Tasks in exclude_gids (created in this process for other keys) are never a match. With created_after (a UTC
+    datetime), only tasks created since then match, and only when exactly one does, so an older task or another
+    caller's task with the same name is never taken for this request's.
+    """
+    data = task_body["data"]
+    opts = {"opt_fields": "gid,name,due_on,created_at"}
+    if data.get("parent"):
+        list_tasks = tasks_api.get_subtasks_for_task
+        args = (data["parent"], opts)
+    elif data.get("projects") and data["projects"][0]:
+        opts["project"] = data["projects"][0]
+        list_tasks = tasks_api.get_tasks
+        args = (opts,)
+    else:
+        return None
+
+    def find_matching_task(**kwargs):
+        matches = []
+        for task in list_tasks(*args, **kwargs):
+            if task.get("gid") in exclude_gids:
+                continue
+            if task.get("name") != data.get("name") or (data.get("due_on") and task.get("due_on") != data.get("due_on")):
+                continue
+            if created_after is None:
+                return task
+            if task.get("created_at") and datetime.fromisoformat(task["created_at"].replace("Z", "+00:00")) >= created_after:
+                matches.append(task)
+        return matches[0] if len(matches) == 1 else None
+
+    return call_asana(api_client, find_matching_task, before_request=before_request)
+
+
+@contextmanager
+def _key_lock(key):
+    """Holds the lock of a dedup key, the lock is dropped once no thread uses it"""
+    with _dedup_lock:
+        key_lock = _dedup_locks.setdefault(key, [threading.Lock(), 0])
+        key_lock[1] += 1
+    try:
+        with key_lock[0]:
+            yield
+    finally:
+        with _dedup_lock:
+            key_lock[1] -= 1
+            if not key_lock[1]:
+                del _dedup_locks[key]
+
+
+@contextmanager
+def _no_lock():
+    yield
+
+
+def _recently_created(key):
+    """Returns the task created with this idempotency key within dedup_ttl, dropping expired entries"""
+    now = time.monotonic()
+    with _dedup_lock:
+        while _created_tasks and now - next(iter(_created_tasks.values()))[0] > dedup_ttl:
+            _created_tasks.popitem(last=False)
+        entry = _created_tasks.get(key)
+    return entry[1] if entry else None
+
+
+def _remember_created(key, task):
+    with _dedup_lock:
+        _created_tasks[key] = (time.monotonic(), task)
+        _created_tasks.move_to_end(key)
+        while len(_created_tasks) > dedup_max_entries:
+            _created_tasks.popitem(last=False)
+
+
+def create_task(tasks_api, task_body, idempotency_key=None, before_request=None):
+    """
+    Creates a task in Asana at most once.
+
+    Repeating a creation with the same idempotency key within dedup_ttl seconds returns the task created the first
+    time. Without a key, tasks are deduplicated by name + due date (+ parent/project), which suits an agent retrying
+    a tool call; callers creating tasks that may legitimately share a name (e.g. the bulk importer) pass their own
+    key. When a request fails in a way where Asana may have created the task anyway (5xx or no response), the
+    project is checked for it before retrying. With an explicit key only a task created after the first attempt
+    started is taken as this request's, and creations of same-named tasks in this process run one at a time so they
+    can't be mistaken for each other. `before_request` is called before every Asana request.
+    """
+    api_client = tasks_api.api_client
+    signature = task_dedup_key(task_body)
+    dedup_key = idempotency_key or signature
+
+    # Only one thread creates a given task, the others wait and get the same result
+    with _key_lock(dedup_key):
+        existing = _recently_created(dedup_key)
+        if existing is not None:
+            return existing
+
+        with _key_lock(signature) if idempotency_key else _no_lock():
+            from asana.rest import ApiException
+
+            started = datetime.now(timezone.utc).timestamp() - clock_skew
+            created_after = datetime.fromtimestamp(started, timezone.utc) if idempotency_key else None
+
+            def check_if_created(exception):
+                if getattr(exception, "status", None) == 429:
+                    # Throttled requests are rejected before being processed, nothing to look for
+                    return None
+                with _dedup_lock:
+                    other_tasks = {task.get("gid") for _, task in _created_tasks.values()}
+                try:
+                    return _find_existing_task(api_client, tasks_api, task_body, before_request, other_tasks, created_after)
+                except ApiException:
+                    return None
+
+            api_response = call_asana(api_client, tasks_api.create_task, task_body, {}, on_retry=check_if_created, before_request=before_request)
+            _remember_created(dedup_key, api_response)
+            return api_response
+
@@ -0,0 +1,157 @@
+import os
+import re
+import threading
+import time
+
+from common.asana_api import call_asana
+from common.tracing import span
+
+# How long the workspace metadata is considered fresh before it's reloaded in the background
+metadata_ttl = int(os.getenv("ASANA_METADATA_TTL", "600"))
+
+# Asana GIDs are long numeric strings, anything else is treated as a name to resolve
+_gid_pattern = re.compile(r"^\d+$")
+
+
+def _normalize(name):
+    return " ".join(str(name).lower().split())
+
+
+class AsanaMetadataCache:
+    """
+    Local index of the users, tasks and custom fields of an Asana workspace.
+
+    Lets the create_asana_task tool accept names ("Jane Doe", "Design review") where Asana expects GIDs,
+    without asking the user or making an API lookup on every call. The index is loaded on first use and
+    refreshed in a background thread once it is older than `ttl` seconds, serving the old index meanwhile.
+    `before_request` is called before every Asana request, e.g. to wait for a rate limiter.
+    """
+
+    def __init__(self, api_client, workspace_gid=None, project_gid=None, ttl=metadata_ttl, before_request=None):
+        self.api_client = api_client
+        self.workspace_gid = workspace_gid or os.getenv("ASANA_WORKSPACE_ID", "")
+        self.project_gid = project_gid or os.getenv("ASANA_PROJECT_ID", "")
+        self.ttl = ttl
+        self.before_request = before_request
+        self.index = None
+        self.loaded_at = 0.0
+        self.lock = threading.Lock()
+        self.refreshing = False
+
+    def _fetch_all(self, function, *args):
+        """Reads every page of a list endpoint, retrying like any other Asana call"""
+        return call_asana(self.api_client, lambda **kwargs: list(function(*args, **kwargs)), before_request=self.before_request)
+
+    def _load(self):
+        """Fetches the metadata from Asana and builds name -> GID lookups"""
+        import asana
+
+        index = {"users": {}, "tasks": {}, "custom_fields": {}, "enum_options": {}}
+
+        # Without an explicit workspace, use the one the agent's project belongs to
+        if not self.workspace_gid and self.project_gid:
+            projects_api = asana.ProjectsApi(self.api_client)
+            project = call_asana(self.api_client, projects_api.get_project, self.project_gid, {"opt_fields": "workspace"}, before_request=self.before_request)
+            self.workspace_gid = project["workspace"]["gid"]
+
+        if self.workspace_gid:
+            users_api = asana.UsersApi(self.api_client)
+            for user in self._fetch_all(users_api.get_users_for_workspace, self.workspace_gid, {"opt_fields": "name,email"}):
+                index["users"][_normalize(user["name"])] = user["gid"]
+                if user.get("email"):
+                    index["users"][_normalize(user["email"])] = user["gid"]
+
+        if self.project_gid:
+            tasks_api = asana.TasksApi(self.api_client)
+            for task in self._fetch_all(tasks_api.get_tasks, {"project": self.project_gid, "opt_fields": "name"}):
+                index["tasks"][_normalize(task["name"])] = task["gid"]
+
+            settings_api = asana.CustomFieldSettingsApi(self.api_client)
+            opt_fields = "custom_field.name,custom_field.enum_options.name"
+            for setting in self._fetch_all(settings_api.get_custom_field_settings_for_project, self.project_gid, {"opt_fields": opt_fields}):
+                custom_field = setting["custom_field"]
+                index["custom_fields"][_normalize(custom_field["name"])] = custom_field["gid"]
+                index["enum_options"][custom_field["gid"]] = {
+                    _normalize(option["name"]): option["gid"] for option in custom_field.get("enum_options") or []
+                }
+
+        return index
+
+    def _refresh(self):
+        from asana.rest import ApiException
+
+        try:
+            with span("asana", "metadata_refresh"):
+                index = self._load()
+            with self.lock:
+                self.index = index
+                self.loaded_at = time.monotonic()
+        except ApiException:
+            # The span recorded the error, keep serving the cached copy
+            pass
+        finally:
+            self.refreshing = False
+
+    def get_index(self):
+        """Returns the index, loading it on first use and refreshing it in the background when stale"""
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    self.index = self._load()
+                    self.loaded_at = time.monotonic()
+        elif time.monotonic() - self.loaded_at > self.ttl and not self.refreshing:
+            self.refreshing = True
+            threading.Thread(target=self._refresh, daemon=True).start()
+
+        return self.index
+
+    def preload(self):
+        """Starts loading the index in the background so the first tool call doesn't wait for it"""
+        from asana.rest import ApiException
+
+        def load():
+            try:
+                with span("asana", "metadata_preload"):
+                    self.get_index()
+            except ApiException:
+                # The span recorded the error, the first tool call loads the index again
+                pass
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def remember_task(self, name, gid):
+        """Adds a task created by the agent so later requests can depend on it by name"""
+        if self.index is not None:
+            self.index["tasks"][_normalize(name)] = gid
+
+    def _resolve(self, kind, value):
+        if value is None or _gid_pattern.match(str(value)):
+            return value
+        # Unknown names are passed through unchanged so Asana reports them as usual
+        return self.get_index()[kind].get(_normalize(value), value)
+
+    def resolve_user(self, value):
+        """Resolves a user name or email (or "me") to a user GID"""
+        if value == "me":
+            return value
+        return self._resolve("users", value)
+
+    def resolve_task(self, value):
+        return self._resolve("tasks", value)
+
+    def resolve_tasks(self, values):
+        return [self.resolve_task(value) for value in values] if values else values
+
+    def resolve_custom_fields(self, custom_fields):
+        """Resolves custom field names, and enum option names in their values, to GIDs"""
+        if not custom_fields:
+            return custom_fields
+
+        resolved = {}
+        for field, value in custom_fields.items():
+            field_gid = self._resolve("custom_fields", field)
+            options = self.get_index()["enum_options"].get(field_gid)
+            if options and isinstance(value, str) and not _gid_pattern.match(value):
+                value = options.get(_normalize(value), value)
+            resolved[field_gid] = value
+        return resolved
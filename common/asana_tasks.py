@@ -0,0 +1,74 @@
+from datetime import datetime
+import os
+
+from common.asana_api import create_task
+
+
+def build_task_body(task_name, due_on="today", description=None, assignee=None, dependencies=None, custom_fields=None):
+    """
+    Builds the request body for creating a task in Asana
+
+    Used by the chat agents' create_asana_task tool and by the bulk importer so both create tasks the same way.
+    """
+    if due_on == "today":
+        due_on = str(datetime.now().date())
+
+    task_body = {
+        "data": {
+            "name": task_name,
+            "due_on": due_on,
+            "projects": [os.getenv("ASANA_PROJECT_ID", "")]
+        }
+    }
+
+    # Add optional fields if provided
+    if description:
+        task_body["data"]["notes"] = description
+    if assignee:
+        task_body["data"]["assignee"] = assignee
+    if dependencies:
+        task_body["data"]["dependencies"] = dependencies
+    if custom_fields:
+        task_body["data"]["custom_fields"] = custom_fields
+
+    return task_body
+
+
+def build_subtask_body(subtask_name, parent_gid):
+    """Builds the request body for creating a subtask under the task with GID `parent_gid`"""
+    return {
+        "data": {
+            "name": subtask_name,
+            "parent": parent_gid,
+            "projects": [os.getenv("ASANA_PROJECT_ID", "")]
+        }
+    }
+
+
+def build_resolved_task_body(metadata_cache, task_name, due_on="today", description=None, assignee=None, dependencies=None, custom_fields=None):
+    """Like build_task_body, but the assignee, dependencies and custom fields may be names, resolved to GIDs with `metadata_cache`"""
+    assignee = metadata_cache.resolve_user(assignee)
+    dependencies = metadata_cache.resolve_tasks(dependencies)
+    custom_fields = metadata_cache.resolve_custom_fields(custom_fields)
+    return build_task_body(task_name, due_on, description, assignee, dependencies, custom_fields)
+
+
+def create_task_with_subtasks(tasks_api, metadata_cache, task_name, due_on="today", description=None, assignee=None, dependencies=None, custom_fields=None, subtasks=None):
+    """
+    Creates a task and its subtasks the way the chat agents' create_asana_task tool does and returns the created task.
+
+    Names are resolved locally from the cached workspace metadata, and the new task is added to it so later
+    requests can depend on it by name. Raises ApiException when Asana rejects a request.
+    """
+    task_body = build_resolved_task_body(metadata_cache, task_name, due_on, description, assignee, dependencies, custom_fields)
+
+    # Create main task
+    api_response = create_task(tasks_api, task_body)
+    task_gid = api_response['gid']
+    metadata_cache.remember_task(task_name, task_gid)
+
+    # Create subtasks if provided
+    for subtask_name in subtasks or []:
+        create_task(tasks_api, build_subtask_body(subtask_name, task_gid))
+
+    return api_response
@@ -0,0 +1,61 @@
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+import json
+import warnings
+
+from common.llm_cache import cache_key, get_llm_cache
+
+
+class LangChainLLMCache(BaseCache):
+    """
+    Plugs the on-disk LLM cache into LangChain chat models, e.g. `ChatOpenAI(model=model, cache=langchain_cache())`.
+
+    LangChain passes the serialized messages as `prompt` and the model name, temperature and bound tools as
+    `llm_string`, so both go into the key. Streamed calls don't go through LangChain's cache.
+
+    LangChain reports a hit to the callbacks like a real call, so the returned messages are marked with
+    `response_metadata["cached"]` and carry no token usage: the trace and the run's token budget only count the
+    tokens that were actually spent. The per-call fields (ids, usage, response metadata) of the earlier messages
+    are left out of the key, so a conversation replayed from the cache keeps hitting it.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def lookup(self, prompt, llm_string):
+        value = self.cache.get(cache_key(llm_string, _stable_prompt(prompt)))
+        if value is None:
+            return None
+
+        # loads() warns that it's in beta on every call
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", LangChainBetaWarning)
+            generations = loads(value)
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None:
+                message.usage_metadata = None
+                message.response_metadata = dict(message.response_metadata, cached=True)
+        return generations
+
+    def update(self, prompt, llm_string, return_val):
+        self.cache.set(cache_key(llm_string, _stable_prompt(prompt)), dumps(return_val))
+
+    def clear(self, **kwargs):
+        self.cache.clear()
+
+
+def _stable_prompt(prompt):
+    """The serialized messages without the fields that differ between a real response and a cached one"""
+    messages = json.loads(prompt)
+    for message in messages:
+        for field in ("id", "usage_metadata", "response_metadata"):
+            message.get("kwargs", {}).pop(field, None)
+    return messages
+
+
+def langchain_cache():
+    """The cache to pass to a LangChain model, or None (LangChain's default) when LLM_CACHE isn't enabled"""
+    cache = get_llm_cache()
+    return LangChainLLMCache(cache) if cache else None
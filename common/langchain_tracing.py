@@ -0,0 +1,54 @@
+from langchain_core.callbacks import BaseCallbackHandler
+
+from common.tracing import Span
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Records every LangChain chat model call as an "llm" span with its token usage and time to first token.
+    Calls answered from the LLM cache are tagged `cached=True` and have no token usage.
+
+    Pass it when creating the model, e.g. `ChatOpenAI(model=model, callbacks=[TracingCallbackHandler()])`.
+    """
+
+    def __init__(self):
+        self.spans = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        invocation = kwargs.get("invocation_params") or {}
+        name = invocation.get("model") or invocation.get("model_name") or (serialized or {}).get("name", "chat_model")
+        self.spans[run_id] = Span("llm", name, messages=sum(len(batch) for batch in messages))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        invocation = kwargs.get("invocation_params") or {}
+        name = invocation.get("model") or invocation.get("repo_id") or (serialized or {}).get("name", "llm")
+        self.spans[run_id] = Span("llm", name)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if run_id in self.spans:
+            self.spans[run_id].mark_first_token()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        current = self.spans.pop(run_id, None)
+        if current is None:
+            return
+
+        # Chat models report usage on the message, older integrations in llm_output
+        usage = {}
+        generations = response.generations[0] if response.generations else []
+        message = getattr(generations[0], "message", None) if generations else None
+        if message is not None and message.response_metadata.get("cached"):
+            usage = {"cached": True}
+        elif message is not None and getattr(message, "usage_metadata", None):
+            usage = {"prompt_tokens": message.usage_metadata.get("input_tokens"), "completion_tokens": message.usage_metadata.get("output_tokens")}
+        elif response.llm_output and response.llm_output.get("token_usage"):
+            token_usage = response.llm_output["token_usage"]
+            usage = {"prompt_tokens": token_usage.get("prompt_tokens"), "completion_tokens": token_usage.get("completion_tokens")}
+
+        current.set(**usage)
+        current.end()
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        current = self.spans.pop(run_id, None)
+        if current is not None:
+            current.end(error=error)
@@ -0,0 +1,131 @@
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# The cache is opt-in: set LLM_CACHE=1 to reuse the responses to prompts that were already sent
+cache_enabled = os.getenv("LLM_CACHE", "0").lower() in ("1", "true", "yes")
+cache_path = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+# Responses older than this many seconds are sent to the model again
+cache_ttl = int(os.getenv("LLM_CACHE_TTL", str(24 * 60 * 60)))
+# Least recently used responses are evicted once the cache holds more than this many bytes
+cache_max_bytes = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+def cache_key(model, messages, tools=None, temperature=None):
+    """Deterministic key for a model call: the same model, messages, tools and temperature give the same key"""
+    payload = json.dumps({"model": model, "messages": messages, "tools": tools, "temperature": temperature}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Disk-backed (SQLite) cache of model responses with a TTL, size based LRU eviction and hit-rate counters.
+
+    Values are strings, callers serialize the responses themselves. Hits and misses are kept in the database
+    too, so the hit rate covers every run that used the same cache file.
+    """
+
+    def __init__(self, path=cache_path, ttl=cache_ttl, max_bytes=cache_max_bytes):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, size INTEGER, created REAL, last_used REAL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+
+    @contextmanager
+    def _connect(self):
+        """Opens a connection that commits and closes when the block ends, so the cache can be used from any thread"""
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _count(self, connection, name):
+        connection.execute("INSERT INTO stats (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def get(self, key):
+        """Returns the cached value for key, or None when it's missing or expired"""
+        now = time.time()
+        with self.lock, self._connect() as connection:
+            row = connection.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count(connection, "misses")
+                return None
+
+            connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._count(connection, "hits")
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self.lock, self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict(connection)
+
+    def _evict(self, connection):
+        """Deletes the least recently used responses until the cache fits in max_bytes"""
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in connection.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._count(connection, "evictions")
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self.lock, self._connect() as connection:
+            connection.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self.lock, self._connect() as connection:
+            stats = dict(connection.execute("SELECT name, value FROM stats").fetchall())
+            entries, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+        hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "evictions": stats.get("evictions", 0),
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Returns the shared cache, or None when LLM_CACHE isn't enabled"""
+    global _cache
+    if not cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+if __name__ == "__main__":
+    # python -m common.llm_cache [cache file]
+    stats = LLMCache(sys.argv[1] if len(sys.argv) > 1 else cache_path).stats()
+    print(f"Entries: {stats['entries']} ({stats['bytes']} bytes), hits: {stats['hits']}, misses: {stats['misses']}, "
+          f"hit rate: {stats['hit_rate']:.1%}, evictions: {stats['evictions']}")
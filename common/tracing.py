@@ -0,0 +1,162 @@
+from contextlib import contextmanager
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+# Every span is appended to this JSONL file, set AGENT_TRACE_FILE to an empty string to turn tracing off
+trace_file = os.getenv("AGENT_TRACE_FILE", "agent_trace.jsonl")
+
+# The user turn the current code is running for, so spans from the same turn can be grouped together
+_current_turn = contextvars.ContextVar("current_turn", default=None)
+_write_lock = threading.Lock()
+
+
+class Span:
+    """
+    One timed operation: a model call, a tool invocation, an Asana/GitHub API call or a RAG retrieval.
+
+    `kind` groups spans in the summary ("llm", "tool", "asana", "github", "retrieval", "turn") and `name` says
+    which model, tool or endpoint it was. Extra attributes such as token counts are added with `set`.
+    """
+
+    def __init__(self, kind, name, **attributes):
+        self.kind = kind
+        self.name = name
+        self.attributes = attributes
+        self.turn_id = _current_turn.get()
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.first_token = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def mark_first_token(self):
+        """Records the time to first token the first time it's called for a streamed response"""
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def end(self, error=None):
+        """Writes the span to the trace, `error` is the exception (or a message) the operation failed with"""
+        if isinstance(error, BaseException):
+            error = f"{type(error).__name__}: {error}"
+        record = {
+            "turn_id": self.turn_id,
+            "kind": self.kind,
+            "name": self.name,
+            "start": self.started_at,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "error": error or None,
+        }
+        if self.first_token is not None:
+            record["ttft_ms"] = round((self.first_token - self.started) * 1000, 2)
+        record.update(self.attributes)
+        _write(record)
+
+
+def _write(record):
+    if not trace_file:
+        return
+    with _write_lock, open(trace_file, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+
+
+@contextmanager
+def span(kind, name, **attributes):
+    """Times the code in the `with` block as a span, recording any exception raised in it as the span's error"""
+    current = Span(kind, name, **attributes)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(error=e)
+        raise
+    else:
+        current.end()
+
+
+def event(kind, name, error=None, **attributes):
+    """Records something that happened rather than an operation, e.g. a configuration check, as a zero-length span"""
+    Span(kind, name, **attributes).end(error=error)
+
+
+@contextmanager
+def turn(agent):
+    """Marks one user turn of an agent, every span started inside it is tagged with the turn's id"""
+    token = _current_turn.set(uuid.uuid4().hex)
+    try:
+        with span("turn", agent) as current:
+            yield current
+    finally:
+        _current_turn.reset(token)
+
+
+def in_current_context(function):
+    """
+    Wraps a function so it runs in a copy of the caller's context when called from another thread,
+    e.g. `executor.map(in_current_context(run_tool_call), tool_calls)`, so its spans keep the turn id.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(function, *args, **kwargs)
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def summarize(path=None):
+    """
+    Returns count, p50/p95 latency, errors and tokens per span kind (and name) from a trace file.
+
+    Calls answered from the LLM cache (spans tagged `cached`) are only counted as cache hits, they don't take part
+    in the latencies.
+    """
+    groups = {}
+    with open(path or trace_file, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            for key in (record["kind"], f"{record['kind']}:{record['name']}"):
+                group = groups.setdefault(key, {"durations": [], "ttfts": [], "cache_hits": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0})
+                if record.get("cached"):
+                    group["cache_hits"] += 1
+                    continue
+                group["durations"].append(record["duration_ms"])
+                if record.get("ttft_ms") is not None:
+                    group["ttfts"].append(record["ttft_ms"])
+                group["errors"] += 1 if record.get("error") else 0
+                group["prompt_tokens"] += record.get("prompt_tokens") or 0
+                group["completion_tokens"] += record.get("completion_tokens") or 0
+
+    summary = {}
+    for key, group in sorted(groups.items()):
+        summary[key] = {
+            "count": len(group["durations"]),
+            "cache_hits": group["cache_hits"],
+            "p50_ms": _percentile(group["durations"], 50) if group["durations"] else None,
+            "p95_ms": _percentile(group["durations"], 95) if group["durations"] else None,
+            "ttft_p50_ms": _percentile(group["ttfts"], 50) if group["ttfts"] else None,
+            "errors": group["errors"],
+            "prompt_tokens": group["prompt_tokens"],
+            "completion_tokens": group["completion_tokens"],
+        }
+    return summary
+
+
+def print_summary(path=None):
+    print(f"{'span':<40} {'count':>6} {'cached':>7} {'p50 ms':>10} {'p95 ms':>10} {'ttft p50':>10} {'errors':>7} {'tokens in/out':>16}")
+    for key, row in summarize(path).items():
+        p50, p95, ttft = (f"{row[name]:.1f}" if row[name] is not None else "-" for name in ("p50_ms", "p95_ms", "ttft_p50_ms"))
+        tokens = f"{row['prompt_tokens']}/{row['completion_tokens']}"
+        print(f"{key:<40} {row['count']:>6} {row['cache_hits']:>7} {p50:>10} {p95:>10} {ttft:>10} {row['errors']:>7} {tokens:>16}")
+
+
+if __name__ == "__main__":
+    # python -m common.tracing [trace file]
+    print_summary(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The tests import the shared helpers and the stub servers the same way the scripts and benchmarks do
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(root)
+sys.path.append(os.path.join(root, "benchmarks"))
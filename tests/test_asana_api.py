@@ -0,0 +1,73 @@
+import asana
+import pytest
+
+from common import asana_api
+from stub_servers import start_asana_stub
+
+
+@pytest.fixture
+def asana_stub():
+    server = start_asana_stub()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def tasks_api(asana_stub, monkeypatch):
+    # No backoff between attempts and a clean dedup map for every test
+    monkeypatch.setattr(asana_api, "_retry_delay", lambda exception, attempt: 0)
+    monkeypatch.setattr(asana_api, "_created_tasks", type(asana_api._created_tasks)())
+    configuration = asana.Configuration()
+    configuration.access_token = "test-token"
+    configuration.host = asana_stub.url
+    return asana.TasksApi(asana.ApiClient(configuration))
+
+
+def task_body(name, project="42"):
+    return {"data": {"name": name, "projects": [project], "due_on": "2026-10-19"}}
+
+
+def test_retries_a_failed_creation(asana_stub, tasks_api):
+    asana_stub.failures.append("before")
+
+    task = asana_api.create_task(tasks_api, task_body("Standup"), idempotency_key="bulk-import:7")
+
+    assert task["name"] == "Standup"
+    assert [created["gid"] for created in asana_stub.tasks] == [task["gid"]]
+
+
+def test_finds_a_task_created_before_the_error(asana_stub, tasks_api):
+    asana_stub.failures.append("after")
+
+    task = asana_api.create_task(tasks_api, task_body("Standup"), idempotency_key="bulk-import:7")
+
+    # The task created by the failed attempt is returned instead of being created again
+    assert [created["gid"] for created in asana_stub.tasks] == [task["gid"]]
+
+
+def test_does_not_adopt_an_older_task_with_the_same_name(asana_stub, tasks_api):
+    asana_stub.tasks.append(dict(task_body("Standup")["data"], gid="999", created_at="2020-01-01T00:00:00.000Z"))
+    asana_stub.failures.append("before")
+
+    task = asana_api.create_task(tasks_api, task_body("Standup"), idempotency_key="bulk-import:7")
+
+    assert task["gid"] != "999"
+    assert len(asana_stub.tasks) == 2
+
+
+def test_same_name_rows_are_separate_tasks(asana_stub, tasks_api):
+    first = asana_api.create_task(tasks_api, task_body("Standup"), idempotency_key="bulk-import:1")
+    asana_stub.failures.append("after")
+    second = asana_api.create_task(tasks_api, task_body("Standup"), idempotency_key="bulk-import:2")
+
+    assert first["gid"] != second["gid"]
+    assert {task["gid"] for task in asana_stub.tasks} == {first["gid"], second["gid"]}
+
+
+def test_repeated_key_returns_the_first_task(asana_stub, tasks_api):
+    first = asana_api.create_task(tasks_api, task_body("Standup"), idempotency_key="bulk-import:7")
+    again = asana_api.create_task(tasks_api, task_body("Standup"), idempotency_key="bulk-import:7")
+
+    assert again["gid"] == first["gid"]
+    assert len(asana_stub.tasks) == 1